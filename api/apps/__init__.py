@@ -18,7 +18,9 @@ import sys
 import logging
 from importlib.util import module_from_spec, spec_from_file_location
 from pathlib import Path
+import orjson
 from flask import Blueprint, Flask
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.wrappers.request import Request
 from flask_cors import CORS
 from flasgger import Swagger
@@ -40,7 +42,22 @@ __all__ = ["app"]
 
 Request.json = property(lambda self: self.get_json(force=True, silent=True))
 
+
+class OrjsonRequestProvider(DefaultJSONProvider):
+    """Parse request bodies with orjson; responses keep the default encoder."""
+
+    def loads(self, s, **kwargs):
+        if not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # NaN literals, integers beyond 64 bits and the like: let the stdlib decide
+                pass
+        return super().loads(s, **kwargs)
+
+
 app = Flask(__name__)
+app.json = OrjsonRequestProvider(app)
 smtp_mail_server = Mail()
 
 # Add this at the beginning of your file to configure Swagger UI
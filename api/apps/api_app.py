@@ -269,7 +269,7 @@ def completion():
                         if final_ans.get("reference"):
                             canvas.reference.append(final_ans["reference"])
                         cvs.dsl = json.loads(str(canvas))
-                        API4ConversationService.append_message(conv.id, conv.to_dict())
+                        API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
                     except Exception as e:
                         yield "data:" + json.dumps({"code": 500, "message": str(e),
                                                     "data": {"answer": "**ERROR**: " + str(e), "reference": []}},
@@ -291,7 +291,7 @@ def completion():
 
             result = {"answer": final_ans["content"], "reference": final_ans.get("reference", [])}
             fillin_conv(result)
-            API4ConversationService.append_message(conv.id, conv.to_dict())
+            API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
             rename_field(result)
             return get_json_result(data=result)
 
@@ -316,7 +316,7 @@ def completion():
                     rename_field(ans)
                     yield "data:" + json.dumps({"code": 0, "message": "", "data": ans},
                                                ensure_ascii=False) + "\n\n"
-                API4ConversationService.append_message(conv.id, conv.to_dict())
+                API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
             except Exception as e:
                 yield "data:" + json.dumps({"code": 500, "message": str(e),
                                             "data": {"answer": "**ERROR**: " + str(e), "reference": []}},
@@ -335,8 +335,9 @@ def completion():
         for ans in chat(dia, msg, **req):
             answer = ans
             fillin_conv(ans)
-            API4ConversationService.append_message(conv.id, conv.to_dict())
             break
+        if answer is not None:
+            API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
         rename_field(answer)
         return get_json_result(data=answer)
 
@@ -783,7 +784,7 @@ def completion_faq():
             ans = {"answer": final_ans["content"], "reference": final_ans.get("reference", [])}
             data[0]["content"] += re.sub(r'##\d\$\$', '', ans["answer"])
             fillin_conv(ans)
-            API4ConversationService.append_message(conv.id, conv.to_dict())
+            API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
 
             chunk_idxs = [int(match[2]) for match in re.findall(r'##\d\$\$', ans["answer"])]
             for chunk_idx in chunk_idxs[:1]:
@@ -828,7 +829,7 @@ def completion_faq():
             break
         data[0]["content"] += re.sub(r'##\d\$\$', '', ans["answer"])
         fillin_conv(ans)
-        API4ConversationService.append_message(conv.id, conv.to_dict())
+        API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
 
         chunk_idxs = [int(match[2]) for match in re.findall(r'##\d\$\$', ans["answer"])]
         for chunk_idx in chunk_idxs[:1]:
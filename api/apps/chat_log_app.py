@@ -13,14 +13,114 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import zlib
 from datetime import datetime, timedelta
-from flask import request
+import orjson
+from flask import Response, g, request, stream_with_context
 from flask_login import current_user, login_required
 
+from api import settings
 from api.db.services.chat_log_service import ChatLogService
 from api.db.services.user_service import UserTenantService
+from api.utils import date_string_to_timestamp
 from api.utils.api_utils import get_data_error_result, get_json_result, server_error_response
 
+ONE_DAY_MS = 24 * 60 * 60 * 1000
+
+CSV_EXPORT_FIELDS = [
+    'id', 'create_time', 'user_id', 'question', 'response',
+    'is_flagged', 'log_type', 'flag_reason', 'source',
+    'tokens_used', 'response_time', 'dialog_id', 'conversation_id'
+]
+CSV_FLUSH_SIZE = 64 * 1024
+
+
+def _current_tenant_id():
+    """
+    Resolve the current user's tenant once per request and keep it on flask.g,
+    so handlers and helpers sharing a request do not repeat the lookup.
+    """
+    if "chat_log_tenant_id" not in g:
+        g.chat_log_tenant_id = UserTenantService.first_tenant_id(current_user.id)
+    return g.chat_log_tenant_id
+
+
+def _parse_int(name, default, max_value=None):
+    """
+    Read an integer query parameter, clamped to at least 1 and at most max_value.
+    Raises ValueError with a client-facing message when it is not an integer.
+    """
+    value = request.args.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}. Must be an integer")
+    value = max(value, 1)
+    return min(value, max_value) if max_value else value
+
+
+def _parse_cursor(name):
+    """
+    Read a "<create_time>,<id>" keyset cursor query parameter.
+    Raises ValueError with a client-facing message when it is malformed.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        cursor_time, cursor_id = value.split(",", 1)
+        return int(cursor_time), cursor_id
+    except ValueError:
+        raise ValueError(f"Invalid {name} cursor. Use <create_time>,<id>")
+
+
+def _date_range_filters(start_date=None, end_date=None):
+    """
+    Build create_time predicates for inclusive YYYY-MM-DD date bounds.
+    The dates are parsed once here, create_time is a millisecond timestamp.
+    Raises ValueError with a client-facing message on a malformed date.
+    """
+    filters = []
+    if start_date:
+        try:
+            start_ts = date_string_to_timestamp(start_date, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("Invalid start_date format. Use YYYY-MM-DD")
+        filters.append(ChatLogService.model.create_time >= start_ts)
+    if end_date:
+        try:
+            end_ts = date_string_to_timestamp(end_date, "%Y-%m-%d") + ONE_DAY_MS
+        except ValueError:
+            raise ValueError("Invalid end_date format. Use YYYY-MM-DD")
+        filters.append(ChatLogService.model.create_time < end_ts)
+    return filters
+
+
+def _gzip_stream(chunks):
+    """
+    Gzip-compress a stream of text chunks on the fly.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _export_response(chunks, mimetype, headers=None):
+    """
+    Stream an export, gzip-compressed when the client accepts it.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    if request.accept_encodings["gzip"]:
+        headers["Content-Encoding"] = "gzip"
+        chunks = _gzip_stream(chunks)
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
 
 @manager.route("/list", methods=["GET"])  # noqa: F821
 @login_required
@@ -34,110 +134,96 @@ def list_logs():
     - flag: Filter by flag type (inappropriate|out-of-scope|all|flagged|unflagged)
     - start_date: Start date filter (YYYY-MM-DD)
     - end_date: End date filter (YYYY-MM-DD)
+    - before: Keyset cursor "<create_time>,<id>" from a previous next_cursor (optional, overrides page)
+    - exact_count: 1 to also count the filtered rows, otherwise only has_more is returned (default: 0)
+    
+    Unfiltered views (no search or date range) always report total/pages from
+    the tenant totals; unless exact_count=1 those may lag new logs by a few seconds
     """
     try:
-        # Get query parameters
-        page = int(request.args.get("page", 1))
-        limit = min(int(request.args.get("limit", 50)), 200)
+        # Get and validate query parameters
+        try:
+            page = _parse_int("page", 1)
+            limit = _parse_int("limit", 50, max_value=200)
+            cursor = _parse_cursor("before")
+            date_filters = _date_range_filters(request.args.get("start_date"), request.args.get("end_date"))
+        except ValueError as e:
+            return get_data_error_result(message=str(e))
         filter_user_id = request.args.get("user_id")
         flag_filter = request.args.get("flag", "all")
         search_term = request.args.get("search")
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
-        
-        # Validate page and limit
-        if page < 1:
-            page = 1
-        if limit < 1:
-            limit = 1
-            
+        exact_count = request.args.get("exact_count", "0") == "1"
+        
         offset = (page - 1) * limit
         
         # Get tenant from authenticated user
-        tenants = UserTenantService.query(user_id=current_user.id)
-        if not tenants:
+        tenant_id = _current_tenant_id()
+        if not tenant_id:
             return get_data_error_result(message="User not associated with any tenant")
-        tenant_id = tenants[0].tenant_id
-        
-        # Get all logs for this tenant to calculate global totals
-        all_logs = ChatLogService.query(tenant_id=tenant_id, order_by=ChatLogService.model.create_time, reverse=True)
         
-        # Calculate global totals
-        total_chats = len(all_logs)
-        total_flagged = sum(1 for log in all_logs if log.is_flagged)
-        total_out_scope = sum(1 for log in all_logs if log.flag_reason == "out of scope")
-        
-        # Apply user filter to totals if specified
-        if filter_user_id and filter_user_id != "all":
-            user_logs = [log for log in all_logs if log.user_id == filter_user_id]
-            total_chats = len(user_logs)
-            total_flagged = sum(1 for log in user_logs if log.is_flagged)
-            total_out_scope = sum(1 for log in user_logs if log.flag_reason == "out of scope")
+        # When the page is filtered only by user and flag, its row count is
+        # one of the global totals and does not need its own COUNT query.
+        # The briefly cached totals serve that count unless exact_count asks
+        # for an up-to-date one
+        count_from_totals = not search_term and not date_filters
+        
+        # Calculate global totals, scoped to the user filter if specified
+        total_chats, total_flagged, total_out_scope = ChatLogService.totals(
+            tenant_id,
+            user_id=filter_user_id if filter_user_id != "all" else None,
+            fresh=count_from_totals and exact_count
+        )
         
-        # Build query arguments for filtered results
-        query_args = {"tenant_id": tenant_id}
+        # Build WHERE expressions for filtered results
+        model = ChatLogService.model
+        filters = []
         
         # Apply user filter to query
         if filter_user_id and filter_user_id != "all":
-            query_args["user_id"] = filter_user_id
+            filters.append(model.user_id == filter_user_id)
             
         # Apply flag filter
         if flag_filter == "flagged":
-            query_args["is_flagged"] = True
+            filters.append(model.is_flagged == True)  # noqa: E712
         elif flag_filter == "unflagged":
-            query_args["is_flagged"] = False
+            filters.append(model.is_flagged == False)  # noqa: E712
         elif flag_filter == "inappropriate":
-            query_args["flag_reason"] = "inappropriate"
+            filters.append(model.flag_reason == "inappropriate")
         elif flag_filter == "out-of-scope":
-            query_args["flag_reason"] = "out of scope"
-        
-        # Get logs ordered by create_time descending (latest first)
-        logs = ChatLogService.query(**query_args, order_by=ChatLogService.model.create_time, reverse=True)
+            filters.append(model.flag_reason == "out of scope")
         
         # Apply search filter if provided
         if search_term:
-            search_lower = search_term.lower()
-            filtered_logs = []
-            for log in logs:
-                if (search_lower in log.question.lower() or 
-                    (log.response and search_lower in log.response.lower()) or
-                    search_lower in log.user_id.lower()):
-                    filtered_logs.append(log)
-            logs = filtered_logs
+            filters.append(ChatLogService.search_filter(search_term))
         
         # Apply date filtering
-        if start_date or end_date:
-            filtered_logs = []
-            for log in logs:
-                # Handle different datetime formats
-                if hasattr(log.create_time, 'date'):
-                    log_date = log.create_time.date()
-                else:
-                    # Assume it's already a date or can be converted
-                    log_date = log.create_time
-                
-                if start_date:
-                    try:
-                        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-                        if log_date < start_dt:
-                            continue
-                    except ValueError:
-                        return get_data_error_result(message="Invalid start_date format. Use YYYY-MM-DD")
-                
-                if end_date:
-                    try:
-                        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-                        if log_date > end_dt:
-                            continue
-                    except ValueError:
-                        return get_data_error_result(message="Invalid end_date format. Use YYYY-MM-DD")
-                
-                filtered_logs.append(log)
-            logs = filtered_logs
-        
-        # Apply pagination
-        total_count = len(logs)
-        paginated_logs = logs[offset:offset + limit]
+        filters.extend(date_filters)
+        
+        known_count = None
+        if count_from_totals:
+            known_count = {
+                "all": total_chats,
+                "flagged": total_flagged,
+                "unflagged": total_chats - total_flagged,
+                "out-of-scope": total_out_scope,
+            }.get(flag_filter)
+        
+        # Get one page of logs ordered by create_time descending (latest first),
+        # one extra row tells whether another page follows without a COUNT
+        total_count, paginated_logs = ChatLogService.paginate(
+            tenant_id,
+            filters=filters,
+            order_by="create_time",
+            reverse=True,
+            offset=offset,
+            limit=limit + 1,
+            cursor=cursor,
+            exact_count=exact_count and known_count is None
+        )
+        if known_count is not None:
+            total_count = known_count
+        has_more = len(paginated_logs) > limit
+        paginated_logs = paginated_logs[:limit]
         
         # Convert to dict format
         logs_data = []
@@ -145,14 +231,25 @@ def list_logs():
             log_dict = log.to_dict()
             logs_data.append(log_dict)
         
+        # Cursor for the next page
+        next_cursor = None
+        if has_more:
+            last_log = paginated_logs[-1]
+            next_cursor = f"{last_log.create_time},{last_log.id}"
+        
+        pagination = {
+            "page": page,
+            "limit": limit,
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        }
+        if total_count is not None:
+            pagination["total"] = total_count
+            pagination["pages"] = (total_count + limit - 1) // limit
+        
         return get_json_result(data={
             "logs": logs_data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total_count,
-                "pages": (total_count + limit - 1) // limit
-            },
+            "pagination": pagination,
             "totals": {
                 "total_chats": total_chats,
                 "total_flagged": total_flagged,
@@ -173,24 +270,31 @@ def get_flagged_logs():
     - limit: Items to return (default: 100, max: 200)
     """
     try:
-        limit = min(int(request.args.get("limit", 100)), 200)
+        try:
+            limit = _parse_int("limit", 100, max_value=200)
+        except ValueError as e:
+            return get_data_error_result(message=str(e))
         
         # Check user access
-        tenants = UserTenantService.query(user_id=current_user.id)
-        if not tenants:
+        tenant_id = _current_tenant_id()
+        if not tenant_id:
             return get_data_error_result(message="User not associated with any tenant")
         
-        tenant_id = tenants[0].tenant_id
-        
         # Get flagged logs
         flagged_logs = ChatLogService.get_flagged_logs(tenant_id=tenant_id, limit=limit)
         
         # Convert to dict format
         logs_data = [log.to_dict() for log in flagged_logs]
         
+        # Only a full page needs a COUNT to tell how many flagged logs exist
+        total = len(logs_data)
+        if total == limit:
+            total = ChatLogService.count_flagged_logs(tenant_id=tenant_id)
+        
         return get_json_result(data={
             "flagged_logs": logs_data,
-            "count": len(logs_data)
+            "count": len(logs_data),
+            "total": total
         })
         
     except Exception as e:
@@ -206,15 +310,16 @@ def get_statistics():
     - days: Number of days to include in stats (default: 30)
     """
     try:
-        days = int(request.args.get("days", 30))
+        try:
+            days = _parse_int("days", 30)
+        except ValueError as e:
+            return get_data_error_result(message=str(e))
         
         # Check user access
-        tenants = UserTenantService.query(user_id=current_user.id)
-        if not tenants:
+        tenant_id = _current_tenant_id()
+        if not tenant_id:
             return get_data_error_result(message="User not associated with any tenant")
         
-        tenant_id = tenants[0].tenant_id
-        
         # Calculate date range
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
@@ -241,15 +346,16 @@ def get_user_logs(user_id):
     - limit: Items to return (default: 100, max: 200)
     """
     try:
-        limit = min(int(request.args.get("limit", 100)), 200)
+        try:
+            limit = _parse_int("limit", 100, max_value=200)
+        except ValueError as e:
+            return get_data_error_result(message=str(e))
         
         # Check user access
-        tenants = UserTenantService.query(user_id=current_user.id)
-        if not tenants:
+        tenant_id = _current_tenant_id()
+        if not tenant_id:
             return get_data_error_result(message="User not associated with any tenant")
         
-        tenant_id = tenants[0].tenant_id
-        
         # Get user logs
         user_logs = ChatLogService.get_logs_by_user(
             user_id=user_id,
@@ -278,21 +384,17 @@ def get_conversation_logs(conversation_id):
     """
     try:
         # Check user access
-        tenants = UserTenantService.query(user_id=current_user.id)
-        if not tenants:
+        tenant_id = _current_tenant_id()
+        if not tenant_id:
             return get_data_error_result(message="User not associated with any tenant")
         
-        # Get conversation logs
-        conversation_logs = ChatLogService.get_logs_by_conversation(conversation_id)
+        # Get conversation logs belonging to the user's tenant
+        conversation_logs = ChatLogService.get_logs_by_conversation(conversation_id, tenant_id)
         
-        # Verify user has access to these logs
-        if conversation_logs:
-            tenant_id = tenants[0].tenant_id
-            # Check if any log belongs to user's tenant
-            user_tenant_logs = [log for log in conversation_logs if log.tenant_id == tenant_id]
-            if not user_tenant_logs:
-                return get_data_error_result(message="Access denied to conversation logs")
-            conversation_logs = user_tenant_logs
+        # Verify user has access to these logs, an empty result is only
+        # denied when the conversation has logs under another tenant
+        if not conversation_logs and ChatLogService.conversation_has_logs(conversation_id):
+            return get_data_error_result(message="Access denied to conversation logs")
         
         # Convert to dict format
         logs_data = [log.to_dict() for log in conversation_logs]
@@ -322,92 +424,70 @@ def export_logs():
         import csv
         import io
         
-        # Get query parameters
+        # Get and validate query parameters
         log_type = request.args.get("log_type")
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
         export_format = request.args.get("format", "csv").lower()
         
         if export_format not in ["csv", "json"]:
             return get_data_error_result(message="Invalid format. Must be 'csv' or 'json'")
         
+        try:
+            date_filters = _date_range_filters(request.args.get("start_date"), request.args.get("end_date"))
+        except ValueError as e:
+            return get_data_error_result(message=str(e))
+        
         # Check user access
-        tenants = UserTenantService.query(user_id=current_user.id)
-        if not tenants:
+        tenant_id = _current_tenant_id()
+        if not tenant_id:
             return get_data_error_result(message="User not associated with any tenant")
         
-        tenant_id = tenants[0].tenant_id
-        
         # Build query
-        query_args = {"tenant_id": tenant_id}
+        filters = date_filters
         if log_type:
-            query_args["log_type"] = log_type
-            
-        logs = ChatLogService.query(**query_args, order_by=ChatLogService.model.create_time, reverse=True)
-        
-        # Apply date filtering
-        if start_date or end_date:
-            filtered_logs = []
-            for log in logs:
-                log_date = log.create_time.date() if hasattr(log.create_time, 'date') else log.create_time
-                
-                if start_date:
-                    try:
-                        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-                        if log_date < start_dt:
-                            continue
-                    except ValueError:
-                        return get_data_error_result(message="Invalid start_date format. Use YYYY-MM-DD")
-                
-                if end_date:
-                    try:
-                        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-                        if log_date > end_dt:
-                            continue
-                    except ValueError:
-                        return get_data_error_result(message="Invalid end_date format. Use YYYY-MM-DD")
-                
-                filtered_logs.append(log)
-            logs = filtered_logs
+            filters.append(ChatLogService.model.log_type == log_type)
         
         if export_format == "json":
-            # JSON export
-            logs_data = [log.to_dict() for log in logs]
-            return get_json_result(data={
-                "logs": logs_data,
-                "export_timestamp": datetime.now().isoformat(),
-                "total_count": len(logs_data)
-            })
-        else:
-            # CSV export
-            output = io.StringIO()
-            fieldnames = [
-                'id', 'create_time', 'user_id', 'question', 'response', 
-                'is_flagged', 'log_type', 'flag_reason', 'source', 
-                'tokens_used', 'response_time', 'dialog_id', 'conversation_id'
-            ]
+            # JSON export, the get_json_result envelope is written around
+            # rows encoded one at a time by orjson instead of one giant document
+            def dumps(value):
+                return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
             
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
+            export_timestamp = datetime.now().isoformat()
             
-            for log in logs:
-                log_dict = log.to_dict()
-                # Select only the fields we want in CSV
-                csv_row = {field: log_dict.get(field, '') for field in fieldnames}
-                writer.writerow(csv_row)
+            def generate():
+                yield f'{{"code": {settings.RetCode.SUCCESS.value}, "message": "success", "data": {{"export_timestamp": {dumps(export_timestamp)}, "logs": ['
+                total_count = 0
+                for row in ChatLogService.iter_logs(tenant_id, filters):
+                    yield ("," if total_count else "") + dumps(row)
+                    total_count += 1
+                yield f'], "total_count": {total_count}}}}}'
             
-            csv_content = output.getvalue()
-            output.close()
+            return _export_response(generate(), mimetype='application/json')
+        else:
+            # CSV export, only the exported columns are selected and
+            # rows are streamed through a reused buffer
+            def generate():
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(CSV_EXPORT_FIELDS)
+                
+                # Rows arrive one keyset page at a time, the buffer is
+                # flushed in chunks rather than one tiny write per row
+                for row in ChatLogService.iter_logs(tenant_id, filters, cols=CSV_EXPORT_FIELDS):
+                    writer.writerow([row[field] for field in CSV_EXPORT_FIELDS])
+                    if buffer.tell() >= CSV_FLUSH_SIZE:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate(0)
+                yield buffer.getvalue()
             
-            from flask import Response
-            response = Response(
-                csv_content,
+            return _export_response(
+                generate(),
                 mimetype='text/csv',
                 headers={
                     'Content-Disposition': f'attachment; filename=chat_logs_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
                 }
             )
-            return response
         
     except Exception as e:
         return server_error_response(e)
@@ -421,12 +501,10 @@ def delete_all_logs():
     """
     try:
         # Check user access
-        tenants = UserTenantService.query(user_id=current_user.id)
-        if not tenants:
+        tenant_id = _current_tenant_id()
+        if not tenant_id:
             return get_data_error_result(message="User not associated with any tenant")
         
-        tenant_id = tenants[0].tenant_id
-        
         # Delete all logs for this tenant
         deleted_count = ChatLogService.delete_all_logs(tenant_id=tenant_id)
         
@@ -13,12 +13,12 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import hashlib
 import json
 import logging
 import re
-import traceback
 import time
-from copy import deepcopy
+import orjson
 from flask import Response, request
 from flask_login import current_user, login_required
 from api import settings
@@ -26,30 +26,64 @@ from api.db import LLMType
 from api.db.db_models import APIToken
 from api.db.services.conversation_service import ConversationService, structure_answer
 from api.db.services.dialog_service import DialogService, ask, chat, gen_mindmap
-from api.db.services.llm_service import LLMBundle
+from api.db.services.llm_service import get_cached_llm_bundle
 from api.db.services.search_service import SearchService
 from api.db.services.tenant_llm_service import TenantLLMService
 from api.db.services.user_service import TenantService, UserTenantService
-from api.db.services.chat_log_service import ChatLogService
+from api.db.services.chat_log_service import ChatLogEntry, ChatLogService
 
+from api.utils import get_uuid, semantic_cache
 from api.utils.api_utils import get_data_error_result, get_json_result, server_error_response, validate_request
+from graphrag.utils import get_llm_cache, set_llm_cache
 from rag.prompts.prompt_template import load_prompt
 from rag.prompts.prompts import chunks_format
 
+RELATED_QUESTIONS_CACHE_MAX_TEMPERATURE = 0.2
+CHAT_MODEL_CONFIG_KEYS = ("temperature", "top_p", "frequency_penalty", "presence_penalty", "max_tokens")
+
+_THINK_TAG_RE = re.compile(r"</?think>")
+_TTS_SPLIT_RE = re.compile(r"[，。/《》？；：！\n\r:;]+")
+_NUM_PREFIX_RE = re.compile(r"^[0-9]\. ")
+
 
 def clean_think_content(text: str = '') -> str:
     """Remove think content from response text"""
-    import re
-    # Handle nested think tags by repeatedly removing them
-    result = text
-    previous_result = ''
-    
-    # Keep removing think tags until no more are found
-    while result != previous_result:
-        previous_result = result
-        result = re.sub(r'<think>[\s\S]*?</think>', '', result)
+    # Single pass over the tags, tracking nesting depth; only text outside
+    # every think block is kept
+    parts = []
+    depth = 0
+    pos = 0
+    block_start = 0
+    for tag in _THINK_TAG_RE.finditer(text):
+        if depth == 0:
+            parts.append(text[pos:tag.start()])
+            block_start = tag.start()
+        if tag.group() == "<think>":
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:
+            # Stray closing tag outside any think block is ordinary text
+            parts.append(tag.group())
+        pos = tag.end()
+    # An unterminated think block is left as is
+    parts.append(text[block_start if depth else pos:])
     
-    return result.strip()
+    return "".join(parts).strip()
+
+
+def _sse(data) -> bytes:
+    """Encode one server-sent event frame; orjson writes UTF-8 directly"""
+    return b"data:" + orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) + b"\n\n"
+
+
+def event_stream_response(events):
+    """Wrap an SSE generator so proxies flush every event instead of buffering the answer"""
+    resp = Response(events, content_type="text/event-stream; charset=utf-8")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["Connection"] = "keep-alive"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
 
 
 @manager.route("/set", methods=["POST"])  # noqa: F821
@@ -104,20 +138,15 @@ def get():
         e, conv = ConversationService.get_by_id(conv_id)
         if not e:
             return get_data_error_result(message="Conversation not found!")
-        tenants = UserTenantService.query(user_id=current_user.id)
-        avatar = None
-        for tenant in tenants:
-            dialog = DialogService.query(tenant_id=tenant.tenant_id, id=conv.dialog_id)
-            if dialog and len(dialog) > 0:
-                avatar = dialog[0].icon
-                break
-        else:
+        tenant_ids = [tenant.tenant_id for tenant in UserTenantService.query(user_id=current_user.id)]
+        dialogs = DialogService.query_by_tenants(tenant_ids, conv.dialog_id, cols=[DialogService.model.icon])
+        if not dialogs:
             return get_json_result(data=False, message="Only owner of conversation authorized for this operation.", code=settings.RetCode.OPERATING_ERROR)
+        avatar = dialogs[0].icon
 
         for ref in conv.reference:
-            if isinstance(ref, list):
-                continue
-            ref["chunks"] = chunks_format(ref)
+            if isinstance(ref, dict):
+                ref["chunks"] = chunks_format(ref)
 
         conv = conv.to_dict()
         conv["avatar"] = avatar
@@ -152,17 +181,15 @@ def getsse(dialog_id):
 def rm():
     conv_ids = request.json["conversation_ids"]
     try:
-        for cid in conv_ids:
-            exist, conv = ConversationService.get_by_id(cid)
-            if not exist:
-                return get_data_error_result(message="Conversation not found!")
-            tenants = UserTenantService.query(user_id=current_user.id)
-            for tenant in tenants:
-                if DialogService.query(tenant_id=tenant.tenant_id, id=conv.dialog_id):
-                    break
-            else:
-                return get_json_result(data=False, message="Only owner of conversation authorized for this operation.", code=settings.RetCode.OPERATING_ERROR)
-            ConversationService.delete_by_id(cid)
+        convs = list(ConversationService.get_by_ids(conv_ids, cols=[ConversationService.model.id, ConversationService.model.dialog_id]))
+        if len(convs) != len(set(conv_ids)):
+            return get_data_error_result(message="Conversation not found!")
+        tenant_ids = [tenant.tenant_id for tenant in UserTenantService.query(user_id=current_user.id)]
+        dialog_ids = {conv.dialog_id for conv in convs}
+        owned = {d.id for d in DialogService.query_by_tenants(tenant_ids, list(dialog_ids), cols=[DialogService.model.id])}
+        if owned != dialog_ids:
+            return get_json_result(data=False, message="Only owner of conversation authorized for this operation.", code=settings.RetCode.OPERATING_ERROR)
+        ConversationService.delete_by_ids([conv.id for conv in convs])
         return get_json_result(data=True)
     except Exception as e:
         return server_error_response(e)
@@ -196,26 +223,14 @@ def completion():
             continue
         msg.append(m)
     message_id = msg[-1].get("id")
-    chat_model_id = req.get("llm_id", "")
-    req.pop("llm_id", None)
-
-    chat_model_config = {}
-    for model_config in [
-        "temperature",
-        "top_p",
-        "frequency_penalty",
-        "presence_penalty",
-        "max_tokens",
-    ]:
-        config = req.get(model_config)
-        if config:
-            chat_model_config[model_config] = config
+    chat_model_id = req.pop("llm_id", "")
+    chat_model_config = {k: req[k] for k in CHAT_MODEL_CONFIG_KEYS if req.get(k)}
 
     # Initialize logging variables
     start_time = time.time()
     user_question = None
     system_response = None
-    log_id = None
+    log_entry = None
     
     # Extract user question from messages
     if msg and msg[-1].get("role") == "user":
@@ -225,7 +240,9 @@ def completion():
         e, conv = ConversationService.get_by_id(req["conversation_id"])
         if not e:
             return get_data_error_result(message="Conversation not found!")
-        conv.message = deepcopy(req["messages"])
+        # The request body is freshly decoded and its message dicts are never mutated
+        # downstream (structure_answer appends/replaces list items), so sharing them is safe
+        conv.message = list(req["messages"])
         e, dia = DialogService.get_by_id(conv.dialog_id)
         if not e:
             return get_data_error_result(message="Dialog not found!")
@@ -239,152 +256,152 @@ def completion():
 
         if chat_model_id:
             if not TenantLLMService.get_api_key(tenant_id=dia.tenant_id, model_name=chat_model_id):
-                req.pop("chat_model_id", None)
-                req.pop("chat_model_config", None)
                 return get_data_error_result(message=f"Cannot use specified model {chat_model_id}.")
             dia.llm_id = chat_model_id
             dia.llm_setting = chat_model_config
 
+        # Stable per user+dialog prefix key so the provider can route turns to a warm KV-cache
+        prompt_prefix = dia.prompt_config.get("system", "") + dia.prompt_config.get("prologue", "") + dia.llm_id
+        req["prompt_cache_key"] = f"{current_user.id}:{dia.id}:{hashlib.md5(prompt_prefix.encode('utf-8')).hexdigest()[:16]}"
+
         # Flagger logic moved to dialog_service.py after KB retrieval
         # Questions will be flagged there if no relevant knowledge is found
 
-        # Create initial log entry for non-flagged questions
+        # The chat log row collects the answer and flagging verdict and is
+        # written once, when the turn ends
         if user_question:
-            try:
-                log_data = ChatLogService.log_chat_message(
-                    tenant_id=dia.tenant_id,
-                    user_id=current_user.id,
-                    question=user_question,
-                    dialog_id=dia.id,
-                    conversation_id=conv.id,
-                    source="completion",
-                    metadata={
-                        "chat_model_id": dia.llm_id,
-                        "message_id": message_id,
-                        "kb_ids": dia.kb_ids if hasattr(dia, 'kb_ids') else []
-                    }
-                )
-                log_id = log_data.id if hasattr(log_data, 'id') else None
-            except Exception as log_error:
-                print(f"Warning: Failed to create initial log entry: {log_error}")
-
+            log_entry = ChatLogEntry(
+                log_id=get_uuid(),
+                tenant_id=dia.tenant_id,
+                user_id=current_user.id,
+                question=user_question,
+                dialog_id=dia.id,
+                conversation_id=conv.id,
+                source="completion",
+                metadata={
+                    "chat_model_id": dia.llm_id,
+                    "message_id": message_id,
+                    "kb_ids": getattr(dia, "kb_ids", None) or []
+                }
+            )
+
+        # Single-turn questions on low-temperature dialogs that opt in may be
+        # answered from the semantic cache instead of retrieval + LLM
+        use_semantic_cache = (
+            user_question
+            and dia.kb_ids
+            and dia.prompt_config.get("semantic_cache")
+            and sum(1 for m in msg if m["role"] == "user") == 1
+            and semantic_cache.temperature_allows_cache(dia.llm_setting)
+        )
+        
         is_embedded = bool(chat_model_id)
         def stream():
-            nonlocal dia, msg, req, conv, system_response, log_id, start_time
+            nonlocal dia, msg, req, conv, system_response, start_time
             try:
                 final_response = ""  # Store only the final complete response
-                for ans in chat(dia, msg, True, **req):
-                    ans = structure_answer(conv, ans, message_id, conv.id)
-                    
+                final_reference = {}
+                # Moderation, greeting and out-of-scope replies are canned, not grounded
+                canned_reply = False
+                is_flagged, flag_reason = False, None
+                cache_key, cache_vector, cached = None, None, None
+                if use_semantic_cache:
+                    try:
+                        cache_key = semantic_cache.cache_key(dia.tenant_id, dia.id)
+                        cache_vector = semantic_cache.embed_question(dia.tenant_id, dia.kb_ids, user_question)
+                        if cache_vector is not None:
+                            cached = semantic_cache.lookup(cache_key, cache_vector)
+                    except Exception as cache_error:
+                        logging.warning(f"Semantic cache lookup failed: {cache_error}")
+            
+                answers = [cached] if cached else chat(dia, msg, True, **req)
+                for ans in answers:
+                    # A cached reference was stored already formatted
+                    ans = structure_answer(conv, ans, message_id, conv.id, chunks_formatted=bool(cached))
+                
                     # Log the response we got from dialog service
-                    logging.info(f"CONVERSATION APP - Received answer: {ans}")
-                    
+                    # Lazy %-formatting: the growing answer is only rendered when debugging
+                    logging.debug("CONVERSATION APP - Received answer: %s", ans)
+                
                     # Check if this is a flagged response
+                    if ans and (ans.get("is_flagged") or ans.get("is_normal")):
+                        canned_reply = True
                     if ans and ans.get("is_flagged"):
-                        logging.info(f"CONVERSATION APP - Detected flagged response, updating chat log")
-                        logging.info(f"CONVERSATION APP - log_id value: {log_id}")
-                        logging.info(f"CONVERSATION APP - ans data: {ans}")
-                        # Update chat log with flagging information
-                        if log_id:
-                            try:
-                                result = ChatLogService.update_log_with_flagging(
-                                    log_id=log_id,
-                                    response=clean_think_content(ans.get("answer", "I can't answer that")),
-                                    is_flagged=True,
-                                    flag_reason=ans.get("flag_reason", "No relevant knowledge found"),
-                                    response_time=(time.time() - start_time)
-                                )
-                                logging.info(f"Updated chat log {log_id} with flagging information, result: {result}")
-                            except Exception as log_error:
-                                logging.error(f"Warning: Failed to update flagged log: {log_error}")
-                        else:
-                            logging.warning("CONVERSATION APP - log_id is None, cannot update chat log!")
-                    
+                        is_flagged, flag_reason = True, ans.get("flag_reason")
+                    if ans and ans.get("is_flagged") and log_entry:
+                        logging.debug("CONVERSATION APP - Detected flagged response for chat log %s", log_entry.log_id)
+                        log_entry.flag(
+                            clean_think_content(ans.get("answer", "I can't answer that")),
+                            ans.get("flag_reason", "No relevant knowledge found"),
+                            time.time() - start_time
+                        )
+                
                     # Update final response with the latest complete answer
                     if ans and ans.get("answer"):
                         final_response = ans["answer"]
-                    
-                    yield "data:" + json.dumps({"code": 0, "message": "", "data": ans}, ensure_ascii=False) + "\n\n"
+                    if ans and ans.get("reference", {}).get("chunks"):
+                        final_reference = ans["reference"]
                 
-                # Update response in log with only the final complete response
-                if final_response and log_id:
-                    end_time = time.time()
-                    response_time = end_time - start_time
-                    
+                    yield _sse({"code": 0, "message": "", "data": ans})
+            
+                # Record only the final complete response
+                if final_response and log_entry:
+                    log_entry.respond(clean_think_content(final_response), time.time() - start_time)
+            
+                # Only grounded answers are worth replaying
+                if cache_vector is not None and not cached and not canned_reply and final_response and final_reference:
                     try:
-                        ChatLogService.update_response(
-                            log_id=log_id,
-                            response=clean_think_content(final_response),
-                            response_time=response_time
-                        )
-                    except Exception as update_error:
-                        print(f"Warning: Failed to update log response: {update_error}")
-                
-                if not is_embedded:
-                    ConversationService.update_by_id(conv.id, conv.to_dict())
+                        semantic_cache.store(cache_key, cache_vector, final_response, final_reference, is_flagged, flag_reason)
+                    except Exception as cache_error:
+                        logging.warning(f"Semantic cache store failed: {cache_error}")
+            
+                # A turn that produced no answer leaves the stored conversation as it was
+                if not is_embedded and final_response:
+                    ConversationService.update_by_id(conv.id, {"message": conv.message, "reference": conv.reference})
             except Exception as e:
-                traceback.print_exc()
-                yield "data:" + json.dumps({"code": 500, "message": str(e), "data": {"answer": "**ERROR**: " + str(e), "reference": []}}, ensure_ascii=False) + "\n\n"
-            yield "data:" + json.dumps({"code": 0, "message": "", "data": True}, ensure_ascii=False) + "\n\n"
+                logging.exception(e)
+                yield _sse({"code": 500, "message": str(e), "data": {"answer": "**ERROR**: " + str(e), "reference": []}})
+            finally:
+                if log_entry:
+                    ChatLogService.queue_entry(log_entry)
+            yield _sse({"code": 0, "message": "", "data": True})
 
         if req.get("stream", True):
-            resp = Response(stream(), mimetype="text/event-stream")
-            resp.headers.add_header("Cache-control", "no-cache")
-            resp.headers.add_header("Connection", "keep-alive")
-            resp.headers.add_header("X-Accel-Buffering", "no")
-            resp.headers.add_header("Content-Type", "text/event-stream; charset=utf-8")
-            return resp
+            return event_stream_response(stream())
 
         else:
-            answer = None
-            response_parts = []
-            for ans in chat(dia, msg, **req):
-                answer = structure_answer(conv, ans, message_id, conv.id)
-                
-                # Check if this is a flagged response  
-                if ans and ans.get("is_flagged"):
-                    logging.info("CONVERSATION APP (non-streaming) - Detected flagged response")
-                    logging.info(f"CONVERSATION APP (non-streaming) - log_id value: {log_id}")
-                    # Update chat log with flagging information
-                    if log_id:
-                        try:
-                            result = ChatLogService.update_log_with_flagging(
-                                log_id=log_id,
-                                response=ans.get("answer", "I can't answer that"),
-                                is_flagged=True,
-                                flag_reason=ans.get("flag_reason", "No relevant knowledge found"),
-                                response_time=(time.time() - start_time)
-                            )
-                            logging.info(f"Updated chat log {log_id} with flagging information (non-streaming), result: {result}")
-                        except Exception as log_error:
-                            logging.error(f"Warning: Failed to update flagged log (non-streaming): {log_error}")
-                    else:
-                        logging.warning("CONVERSATION APP (non-streaming) - log_id is None, cannot update chat log!")
+            try:
+                answer = None
+                response_parts = []
+                for ans in chat(dia, msg, **req):
+                    answer = structure_answer(conv, ans, message_id, conv.id)
+                    
+                    # Check if this is a flagged response  
+                    if ans and ans.get("is_flagged") and log_entry:
+                        logging.debug("CONVERSATION APP (non-streaming) - Detected flagged response for chat log %s", log_entry.log_id)
+                        log_entry.flag(
+                            ans.get("answer", "I can't answer that"),
+                            ans.get("flag_reason", "No relevant knowledge found"),
+                            time.time() - start_time
+                        )
+                    
+                    # Collect response for logging
+                    if ans and ans.get("answer"):
+                        response_parts.append(ans["answer"])
+                    break
                 
-                # Collect response for logging
-                if ans and ans.get("answer"):
-                    response_parts.append(ans["answer"])
+                # Only the message and reference columns change during a turn
+                if answer is not None and not is_embedded:
+                    ConversationService.update_by_id(conv.id, {"message": conv.message, "reference": conv.reference})
                 
-                if not is_embedded:
-                    ConversationService.update_by_id(conv.id, conv.to_dict())
-                break
-            
-            # Update response in log for non-streaming
-            if response_parts and log_id:
-                system_response = "".join(response_parts)
-                end_time = time.time()
-                response_time = end_time - start_time
+                if response_parts and log_entry:
+                    system_response = "".join(response_parts)
+                    log_entry.respond(clean_think_content(system_response), time.time() - start_time)
                 
-                try:
-                    ChatLogService.update_response(
-                        log_id=log_id,
-                        response=clean_think_content(system_response),
-                        response_time=response_time
-                    )
-                except Exception as update_error:
-                    print(f"Warning: Failed to update log response: {update_error}")
-            
-            return get_json_result(data=answer)
+                return get_json_result(data=answer)
+            finally:
+                if log_entry:
+                    ChatLogService.queue_entry(log_entry)
     except Exception as e:
         return server_error_response(e)
 
@@ -403,11 +420,11 @@ def tts():
     if not tts_id:
         return get_data_error_result(message="No default TTS model is set")
 
-    tts_mdl = LLMBundle(tenants[0]["tenant_id"], LLMType.TTS, tts_id)
+    tts_mdl = get_cached_llm_bundle(tenants[0]["tenant_id"], LLMType.TTS, tts_id)
 
     def stream_audio():
         try:
-            for txt in re.split(r"[，。/《》？；：！\n\r:;]+", text):
+            for txt in _TTS_SPLIT_RE.split(text):
                 for chunk in tts_mdl.tts(txt):
                     yield chunk
         except Exception as e:
@@ -483,7 +500,6 @@ def ask_about():
     # Initialize logging variables
     start_time = time.time()
     system_response = None
-    log_id = None
 
     search_id = req.get("search_id", "")
     search_app = None
@@ -494,60 +510,86 @@ def ask_about():
         search_config = search_app.get("search_config", {})
 
     # Flagger logic moved to dialog_service.py after KB retrieval
-    # Create initial log entry for questions
+    # The chat log row is written once, when the answer has finished
     tenant_id = search_app.get("tenant_id", uid) if search_app else uid
     
-    try:
-        log_data = ChatLogService.log_chat_message(
-            tenant_id=tenant_id,
-            user_id=uid,
-            question=user_question,
-            source="ask",
-            kb_ids=kb_ids,
-            metadata={
-                "search_id": search_id,
+    log_entry = ChatLogEntry(
+        log_id=get_uuid(),
+        tenant_id=tenant_id,
+        user_id=uid,
+        question=user_question,
+        source="ask",
+        kb_ids=kb_ids,
+        metadata={
+            "search_id": search_id,
             "search_config": search_config
         }
-        )
-        log_id = log_data.id if hasattr(log_data, 'id') else None
-    except Exception as log_error:
-        print(f"Warning: Failed to create initial log entry: {log_error}")
+    )
+
+    # Search apps that opt in may be answered from the semantic cache
+    use_semantic_cache = (
+        search_config.get("semantic_cache")
+        and semantic_cache.temperature_allows_cache(search_config.get("llm_setting"))
+    )
 
     def stream():
-        nonlocal req, uid, system_response, log_id, start_time
+        nonlocal req, uid, system_response, start_time
         final_response = ""  # Store only the final complete response
+        final_reference = {}
+        canned_reply = False
+        is_flagged, flag_reason = False, None
         try:
-            for ans in ask(req["question"], req["kb_ids"], uid, search_config=search_config):
+            cache_key, cache_vector, cached = None, None, None
+            if use_semantic_cache:
+                scope_kb_ids = search_config.get("kb_ids", kb_ids)
+                try:
+                    scope = (sorted(scope_kb_ids), sorted(search_config.get("doc_ids", [])))
+                    cache_key = semantic_cache.cache_key(tenant_id, scope)
+                    cache_vector = semantic_cache.embed_question(uid, scope_kb_ids, user_question)
+                    if cache_vector is not None:
+                        cached = semantic_cache.lookup(cache_key, cache_vector)
+                except Exception as cache_error:
+                    logging.warning(f"Semantic cache lookup failed: {cache_error}")
+            
+            prompt_prefix = json.dumps(sorted(search_config.get("kb_ids", kb_ids))) + search_config.get("chat_id", "")
+            prompt_cache_key = f"{uid}:{hashlib.md5(prompt_prefix.encode('utf-8')).hexdigest()[:16]}"
+            answers = [cached] if cached else ask(req["question"], req["kb_ids"], uid, search_config=search_config, prompt_cache_key=prompt_cache_key)
+            for ans in answers:
+                if ans and (ans.get("is_flagged") or ans.get("is_normal")):
+                    canned_reply = True
+                if ans and ans.get("is_flagged"):
+                    is_flagged, flag_reason = True, ans.get("flag_reason")
+                    log_entry.flag(
+                        clean_think_content(ans.get("answer", "I can't answer that")),
+                        ans.get("flag_reason", "No relevant knowledge found"),
+                        time.time() - start_time
+                    )
+                
                 # Update final response with the latest complete answer
                 if ans and ans.get("answer"):
                     final_response = ans["answer"]
+                if ans and ans.get("reference", {}).get("chunks"):
+                    final_reference = ans["reference"]
                 
-                yield "data:" + json.dumps({"code": 0, "message": "", "data": ans}, ensure_ascii=False) + "\n\n"
+                yield _sse({"code": 0, "message": "", "data": ans})
             
-            # Update response in log with only the final complete response
-            if final_response and log_id:
-                end_time = time.time()
-                response_time = end_time - start_time
-                
+            if cache_vector is not None and not cached and not canned_reply and final_response and final_reference:
                 try:
-                    ChatLogService.update_response(
-                        log_id=log_id,
-                        response=clean_think_content(final_response),
-                        response_time=response_time
-                    )
-                except Exception as update_error:
-                    print(f"Warning: Failed to update log response: {update_error}")
+                    semantic_cache.store(cache_key, cache_vector, final_response, final_reference, is_flagged, flag_reason)
+                except Exception as cache_error:
+                    logging.warning(f"Semantic cache store failed: {cache_error}")
+            
+            # Record only the final complete response
+            if final_response:
+                log_entry.respond(clean_think_content(final_response), time.time() - start_time)
                     
         except Exception as e:
-            yield "data:" + json.dumps({"code": 500, "message": str(e), "data": {"answer": "**ERROR**: " + str(e), "reference": []}}, ensure_ascii=False) + "\n\n"
-        yield "data:" + json.dumps({"code": 0, "message": "", "data": True}, ensure_ascii=False) + "\n\n"
+            yield _sse({"code": 500, "message": str(e), "data": {"answer": "**ERROR**: " + str(e), "reference": []}})
+        finally:
+            ChatLogService.queue_entry(log_entry)
+        yield _sse({"code": 0, "message": "", "data": True})
 
-    resp = Response(stream(), mimetype="text/event-stream")
-    resp.headers.add_header("Cache-control", "no-cache")
-    resp.headers.add_header("Connection", "keep-alive")
-    resp.headers.add_header("X-Accel-Buffering", "no")
-    resp.headers.add_header("Content-Type", "text/event-stream; charset=utf-8")
-    return resp
+    return event_stream_response(stream())
 
 
 @manager.route("/mindmap", methods=["POST"])  # noqa: F821
@@ -558,9 +600,8 @@ def mindmap():
     search_id = req.get("search_id", "")
     search_app = SearchService.get_detail(search_id) if search_id else {}
     search_config = search_app.get("search_config", {}) if search_app else {}
-    kb_ids = search_config.get("kb_ids", [])
-    kb_ids.extend(req["kb_ids"])
-    kb_ids = list(set(kb_ids))
+    # Order-preserving dedup keeps retrieval (and the prompt) stable across calls
+    kb_ids = list(dict.fromkeys(kb_id for kb_id in [*search_config.get("kb_ids", []), *req["kb_ids"]] if kb_id))
 
     mind_map = gen_mindmap(req["question"], kb_ids, search_app.get("tenant_id", current_user.id), search_config)
     if "error" in mind_map:
@@ -583,21 +624,28 @@ def related_questions():
     question = req["question"]
 
     chat_id = search_config.get("chat_id", "")
-    chat_mdl = LLMBundle(current_user.id, LLMType.CHAT, chat_id)
 
     gen_conf = search_config.get("llm_setting", {"temperature": 0.9})
     prompt = load_prompt("related_question")
-    ans = chat_mdl.chat(
-        prompt,
-        [
-            {
-                "role": "user",
-                "content": f"""
+    history = [
+        {
+            "role": "user",
+            "content": f"""
 Keywords: {question}
 Related search terms:
     """,
-            }
-        ],
-        gen_conf,
-    )
-    return get_json_result(data=[re.sub(r"^[0-9]\. ", "", a) for a in ans.split("\n") if re.match(r"^[0-9]\. ", a)])
+        }
+    ]
+    # Near-deterministic generations are reused from the shared LLM cache,
+    # keyed by tenant since an empty chat_id means the tenant's default model
+    cache_model = f"{current_user.id}/{chat_id}"
+    cacheable = gen_conf.get("temperature", 1) <= RELATED_QUESTIONS_CACHE_MAX_TEMPERATURE
+    ans = get_llm_cache(cache_model, prompt, history, gen_conf) if cacheable else None
+    if ans:
+        ans = ans.decode("utf-8") if isinstance(ans, bytes) else ans
+    else:
+        chat_mdl = get_cached_llm_bundle(current_user.id, LLMType.CHAT, chat_id)
+        ans = chat_mdl.chat(prompt, history, gen_conf)
+        if cacheable and ans.find("**ERROR**") < 0:
+            set_llm_cache(cache_model, prompt, ans, history, gen_conf)
+    return get_json_result(data=[_NUM_PREFIX_RE.sub("", a) for a in ans.split("\n") if _NUM_PREFIX_RE.match(a)])
@@ -18,7 +18,7 @@ import json
 from flask import request
 from flask_login import login_required, current_user
 from api.db.services.tenant_llm_service import LLMFactoriesService, TenantLLMService
-from api.db.services.llm_service import LLMService
+from api.db.services.llm_service import LLMService, clear_llm_bundle_cache
 from api import settings
 from api.utils.api_utils import server_error_response, get_data_error_result, validate_request
 from api.db import StatusEnum, LLMType
@@ -130,6 +130,7 @@ def set_api_key():
                 max_tokens=llm_config["max_tokens"]
             )
 
+    clear_llm_bundle_cache()
     return get_json_result(data=True)
 
 
@@ -287,6 +288,7 @@ def add_llm():
              TenantLLM.llm_name == llm["llm_name"]], llm):
         TenantLLMService.save(**llm)
 
+    clear_llm_bundle_cache()
     return get_json_result(data=True)
 
 
@@ -298,6 +300,7 @@ def delete_llm():
     TenantLLMService.filter_delete(
         [TenantLLM.tenant_id == current_user.id, TenantLLM.llm_factory == req["llm_factory"],
          TenantLLM.llm_name == req["llm_name"]])
+    clear_llm_bundle_cache()
     return get_json_result(data=True)
 
 
@@ -308,6 +311,7 @@ def delete_factory():
     req = request.json
     TenantLLMService.filter_delete(
         [TenantLLM.tenant_id == current_user.id, TenantLLM.llm_factory == req["llm_factory"]])
+    clear_llm_bundle_cache()
     return get_json_result(data=True)
 
 
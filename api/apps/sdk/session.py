@@ -498,7 +498,16 @@ def list_session(tenant_id, chat_id):
         desc = False
     else:
         desc = True
-    convs = ConversationService.get_list(chat_id, page_number, items_per_page, orderby, desc, id, name, user_id)
+    cursor = None
+    if request.args.get("cursor"):
+        if orderby not in ("create_time", "update_time"):
+            return get_error_data_result(message="`cursor` is only supported when `orderby` is create_time or update_time.")
+        try:
+            cursor_value, cursor_id = request.args["cursor"].rsplit(",", 1)
+            cursor = (int(cursor_value), cursor_id)
+        except ValueError:
+            return get_error_data_result(message="`cursor` must be '<orderby value>,<session id>'.")
+    convs = ConversationService.get_list(chat_id, page_number, items_per_page, orderby, desc, id, name, user_id, cursor)
     if not convs:
         return get_result(data=[])
     for conv in convs:
@@ -74,7 +74,8 @@ class JSONField(LongTextField):
 
     def python_value(self, value):
         if not value:
-            return self.default_value
+            # Callers mutate decoded values in place (chat() adjusts llm_setting), so never hand out the shared default
+            return self.default_value.copy()
         return utils.json_loads(value, object_hook=self._object_hook, object_pairs_hook=self._object_pairs_hook)
 
 
@@ -924,6 +925,12 @@ class ChatLog(DataBaseModel):
 
     class Meta:
         db_table = "chat_log"
+        indexes = (
+            (("tenant_id", "create_time"), False),
+            (("tenant_id", "is_flagged", "create_time"), False),
+            (("user_id", "create_time"), False),
+            (("conversation_id", "create_time"), False),
+        )
 
 
 def migrate_db():
@@ -1042,4 +1049,20 @@ def migrate_db():
         migrate(migrator.add_column("dialog", "meta_data_filter", JSONField(null=True, default={})))
     except Exception:
         pass
+    try:
+        migrate(migrator.add_index("chat_log", ("tenant_id", "create_time"), False))
+    except Exception:
+        pass
+    try:
+        migrate(migrator.add_index("chat_log", ("tenant_id", "is_flagged", "create_time"), False))
+    except Exception:
+        pass
+    try:
+        migrate(migrator.add_index("chat_log", ("user_id", "create_time"), False))
+    except Exception:
+        pass
+    try:
+        migrate(migrator.add_index("chat_log", ("conversation_id", "create_time"), False))
+    except Exception:
+        pass
     logging.disable(logging.NOTSET)
@@ -26,7 +26,7 @@ from api.utils import get_uuid
 from api.utils.api_utils import get_data_openai
 import tiktoken
 from peewee import fn
-from langdetect import detect
+from api.db.services.dialog_service import detect_language, translate_to_english
 
 
 class CanvasTemplateService(CommonService):
@@ -142,14 +142,9 @@ def completion(tenant_id, agent_id, session_id=None, **kwargs):
     user_id = kwargs.get("user_id", "")
 
     # Detect language and translate if needed for knowledge retrieval
-    detected_lang = None
     translated_query = query
     original_query = query  # Keep original for response generation
-    
-    try:
-        detected_lang = detect(query)
-    except Exception:
-        detected_lang = None
+    detected_lang = detect_language(query)
 
     # If language is not English, translate for retrieval purposes
     if detected_lang and detected_lang != "en":
@@ -160,14 +155,7 @@ def completion(tenant_id, agent_id, session_id=None, **kwargs):
             
             # Use a chat model for translation
             chat_mdl = LLMBundle(tenant_id, LLMType.CHAT)
-            translation_prompt = f"Translate the following text to English, only return the translated text, no explanation.\n\nText: {query}"
-            
-            # Get translation
-            translation_result = chat_mdl.chat("", [{"role": "user", "content": translation_prompt}], {"temperature": 0.2})
-            if isinstance(translation_result, dict) and "answer" in translation_result:
-                translated_query = translation_result["answer"]
-            elif isinstance(translation_result, str):
-                translated_query = translation_result
+            translated_query = translate_to_english(chat_mdl, query)
                 
             # Store both original and translated query for different purposes
             kwargs["original_query"] = original_query
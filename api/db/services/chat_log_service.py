@@ -13,19 +13,212 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import atexit
 import logging
+import queue
+import threading
 import time
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
+from cachetools import TTLCache
+from peewee import Case, fn
+
 from api.db.db_models import ChatLog, DB
 from api.db.services.common_service import CommonService
-from api.utils import current_timestamp, get_uuid
+from api.utils import current_timestamp, get_uuid, timestamp_to_date
+
+
+# Per-process cache of (tenant_id, user_id) -> totals, so paging through logs
+# or refreshing the dashboard does not rerun the aggregate every request.
+# New logs show up once the entry expires; deleting a tenant's logs clears it
+_TOTALS_CACHE = TTLCache(maxsize=4096, ttl=15)
+_TOTALS_CACHE_LOCK = threading.Lock()
+
+
+class _ChatLogWriter:
+    """
+    Background writer for chat logs. Queued writes run on one daemon thread
+    in submission order, so a log's insert always lands before its updates.
+    The thread waits up to FLUSH_INTERVAL seconds to gather up to BATCH_SIZE
+    writes, and consecutive queued inserts go out as one multi-row INSERT.
+    """
+    BATCH_SIZE = 128
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, task):
+        """task is either a row dict to insert or a callable to run."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="chat_log_writer", daemon=True)
+                    self._thread.start()
+        self._queue.put(task)
+
+    def flush(self, timeout=5):
+        """Block until everything queued so far has been written."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done.set)
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                # e.g. no database connection; drop the batch but keep the writer alive
+                logging.warning(f"Chat log writer dropped {len(batch)} writes: {e}")
+
+    @staticmethod
+    @DB.connection_context()
+    def _write(batch):
+        rows = []
+        for task in batch + [None]:
+            if isinstance(task, dict):
+                rows.append(task)
+                continue
+            if rows:
+                try:
+                    with DB.atomic():
+                        ChatLog.insert_many(rows).execute()
+                except Exception as e:
+                    logging.warning(f"Chat log insert of {len(rows)} rows failed, retrying row by row: {e}")
+                    # One bad row must not take the rest of the batch with it.
+                    # insert_many keeps the row's create_time, BaseModel.insert
+                    # would stamp the retry time instead
+                    for row in rows:
+                        try:
+                            ChatLog.insert_many([row]).execute()
+                        except Exception as row_error:
+                            logging.warning(f"Chat log {row['id']} dropped: {row_error}")
+                rows = []
+            if task is not None:
+                try:
+                    task()
+                except Exception as e:
+                    logging.warning(f"Chat log write {getattr(task, '__name__', task)} failed: {e}")
+
+
+_LOG_WRITER = _ChatLogWriter()
+atexit.register(_LOG_WRITER.flush)
+
+
+@dataclass(slots=True)
+class ChatLogEntry:
+    """
+    A chat log row built up over one request: the question side is captured
+    up front, the answer and flagging verdict as they arrive, and the row is
+    queued once when the turn ends.
+    """
+    log_id: str
+    tenant_id: str
+    user_id: str
+    question: str
+    dialog_id: str | None = None
+    conversation_id: str | None = None
+    source: str = "completion"
+    kb_ids: list = field(default_factory=list)
+    metadata: dict = field(default_factory=dict)
+    response: str | None = None
+    is_flagged: bool = False
+    flag_reason: str | None = None
+    response_time: float = 0
+    tokens_used: int = 0
+
+    def respond(self, response: str, response_time: float):
+        self.response = response
+        self.response_time = response_time
+
+    def flag(self, response: str, flag_reason: str, response_time: float):
+        self.is_flagged = True
+        self.flag_reason = flag_reason
+        self.respond(response, response_time)
 
 
 class ChatLogService(CommonService):
     model = ChatLog
 
+    @classmethod
+    def queue_entry(cls, entry: ChatLogEntry):
+        """
+        Queue the insert for a finished ChatLogEntry; the background writer
+        batches queued inserts into multi-row INSERTs
+        """
+        _LOG_WRITER.submit(cls._log_row(
+            tenant_id=entry.tenant_id,
+            user_id=entry.user_id,
+            question=entry.question,
+            response=entry.response,
+            dialog_id=entry.dialog_id,
+            conversation_id=entry.conversation_id,
+            is_flagged=entry.is_flagged,
+            flag_reason=entry.flag_reason,
+            kb_ids=entry.kb_ids,
+            tokens_used=entry.tokens_used,
+            response_time=entry.response_time,
+            source=entry.source,
+            metadata=entry.metadata,
+            log_id=entry.log_id
+        ))
+
+    @staticmethod
+    def _log_row(
+        tenant_id: str,
+        user_id: str,
+        question: str,
+        response: str = None,
+        dialog_id: str = None,
+        conversation_id: str = None,
+        is_flagged: bool = False,
+        flag_reason: str = None,
+        kb_ids: List[str] = None,
+        tokens_used: int = 0,
+        response_time: float = 0,
+        source: str = "completion",
+        metadata: Dict[str, Any] = None,
+        log_id: str = None
+    ):
+        now = current_timestamp()
+        return {
+            "id": log_id or get_uuid(),
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "question": question,
+            "response": response,
+            "dialog_id": dialog_id,
+            "conversation_id": conversation_id,
+            "is_flagged": is_flagged,
+            "log_type": "flagged" if is_flagged else "normal",
+            "flag_reason": flag_reason,
+            "kb_ids": kb_ids or [],
+            "tokens_used": tokens_used,
+            "response_time": response_time,
+            "source": source,
+            "metadata": metadata or {},
+            "create_time": now,
+            "create_date": timestamp_to_date(now),
+            "update_time": now,
+            "update_date": timestamp_to_date(now)
+        }
+
     @classmethod
     @DB.connection_context()
     def log_chat_message(
@@ -42,7 +235,8 @@ class ChatLogService(CommonService):
         tokens_used: int = 0,
         response_time: float = 0,
         source: str = "completion",
-        metadata: Dict[str, Any] = None
+        metadata: Dict[str, Any] = None,
+        log_id: str = None
     ):
         """
         Log a chat message with question and response
@@ -61,29 +255,27 @@ class ChatLogService(CommonService):
             response_time: Response time in seconds
             source: Source of the chat (completion|ask|agent)
             metadata: Additional metadata
+            log_id: Pre-generated ID (optional)
         
         Returns:
             The created ChatLog instance
         """
-        log_data = {
-            "id": get_uuid(),
-            "tenant_id": tenant_id,
-            "user_id": user_id,
-            "question": question,
-            "response": response,
-            "dialog_id": dialog_id,
-            "conversation_id": conversation_id,
-            "is_flagged": is_flagged,
-            "log_type": "flagged" if is_flagged else "normal",
-            "flag_reason": flag_reason,
-            "kb_ids": kb_ids or [],
-            "tokens_used": tokens_used,
-            "response_time": response_time,
-            "source": source,
-            "metadata": metadata or {},
-            "create_time": current_timestamp(),
-            "update_time": current_timestamp()
-        }
+        log_data = cls._log_row(
+            tenant_id=tenant_id,
+            user_id=user_id,
+            question=question,
+            response=response,
+            dialog_id=dialog_id,
+            conversation_id=conversation_id,
+            is_flagged=is_flagged,
+            flag_reason=flag_reason,
+            kb_ids=kb_ids,
+            tokens_used=tokens_used,
+            response_time=response_time,
+            source=source,
+            metadata=metadata,
+            log_id=log_id
+        )
         
         return cls.save(**log_data)
 
@@ -129,6 +321,136 @@ class ChatLogService(CommonService):
             metadata=metadata
         )
 
+    @classmethod
+    def search_filter(cls, search_term: str):
+        """
+        Build a case-insensitive substring predicate over question, response and user_id
+        
+        Args:
+            search_term: Text to search for, LIKE wildcards are matched literally
+        
+        Returns:
+            Peewee expression for the WHERE clause
+        """
+        term = search_term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return (
+            cls.model.question.contains(term) |
+            cls.model.response.contains(term) |
+            cls.model.user_id.contains(term)
+        )
+
+    @classmethod
+    @DB.connection_context()
+    def paginate(cls, tenant_id: str, filters: List = None, order_by: str = "create_time", reverse: bool = True, offset: int = 0, limit: int = 50, cursor: tuple = None, exact_count: bool = True):
+        """
+        Get one page of chat logs for a tenant, filtered and ordered by the database
+        
+        Args:
+            tenant_id: Tenant ID
+            filters: Additional peewee expressions for the WHERE clause (optional)
+            order_by: Column name to sort by
+            reverse: Sort descending if True
+            offset: Number of records to skip, ignored when cursor is given
+            limit: Number of records to return
+            cursor: (order_by value, id) of the last record of the previous page (optional),
+                    seeks past it on the index instead of skipping offset rows
+            exact_count: Count all matching records, skipped when False
+        
+        Returns:
+            Tuple of (total matching records or None, list of ChatLog instances for the page)
+        """
+        logs = cls.model.select().where(cls.model.tenant_id == tenant_id, *(filters or []))
+        total_count = logs.count() if exact_count else None
+        
+        order_field = cls.model.getter_by(order_by)
+        if reverse:
+            logs = logs.order_by(order_field.desc(), cls.model.id.desc())
+        else:
+            logs = logs.order_by(order_field.asc(), cls.model.id.asc())
+        
+        if cursor:
+            cursor_value, cursor_id = cursor
+            if reverse:
+                logs = logs.where((order_field < cursor_value) | ((order_field == cursor_value) & (cls.model.id < cursor_id)))
+            else:
+                logs = logs.where((order_field > cursor_value) | ((order_field == cursor_value) & (cls.model.id > cursor_id)))
+            return total_count, list(logs.limit(limit))
+        
+        return total_count, list(logs.offset(offset).limit(limit))
+
+    @classmethod
+    @DB.connection_context()
+    def totals(cls, tenant_id: str, user_id: str = None, fresh: bool = False):
+        """
+        Get chat, flagged and out of scope totals in a single aggregate query
+        
+        Args:
+            tenant_id: Tenant ID
+            user_id: Filter by user ID (optional)
+            fresh: Rerun the aggregate and refresh the cached value, for callers
+                   that asked for exact counts
+        
+        Returns:
+            Tuple of (total_chats, total_flagged, total_out_scope), up to 15 seconds
+            old unless fresh is set
+        """
+        key = (tenant_id, user_id or "")
+        if not fresh:
+            with _TOTALS_CACHE_LOCK:
+                cached = _TOTALS_CACHE.get(key)
+            if cached is not None:
+                return cached
+        
+        filters = [cls.model.tenant_id == tenant_id]
+        if user_id:
+            filters.append(cls.model.user_id == user_id)
+        
+        total_chats, total_flagged, total_out_scope = cls.model.select(
+            fn.COUNT(cls.model.id),
+            fn.SUM(Case(None, [(cls.model.is_flagged == True, 1)], 0)),  # noqa: E712
+            fn.SUM(Case(None, [(cls.model.flag_reason == "out of scope", 1)], 0))
+        ).where(*filters).scalar(as_tuple=True)
+        totals = (int(total_chats or 0), int(total_flagged or 0), int(total_out_scope or 0))
+        with _TOTALS_CACHE_LOCK:
+            _TOTALS_CACHE[key] = totals
+        return totals
+
+    @classmethod
+    def iter_logs(cls, tenant_id: str, filters: List = None, cols: List[str] = None, batch_size: int = 1000):
+        """
+        Yield chat logs for a tenant matching the given filters as dicts, latest first
+        
+        Rows are read in (create_time, id) keyset pages, each page on its own
+        pooled connection, so a long export never holds a connection between
+        pages and only one page is in memory at a time
+        
+        Args:
+            tenant_id: Tenant ID
+            filters: Additional peewee expressions for the WHERE clause (optional)
+            cols: Column names to select (optional, defaults to all columns)
+            batch_size: Number of records read per page
+        
+        Yields:
+            Dict per ChatLog record, always including create_time and id
+        """
+        fields = []
+        if cols:
+            fields = [cls.model.getter_by(col) for col in dict.fromkeys([*cols, "create_time", "id"])]
+        
+        cursor = None
+        while True:
+            logs = cls.model.select(*fields).where(cls.model.tenant_id == tenant_id, *(filters or []))
+            if cursor:
+                create_time, log_id = cursor
+                logs = logs.where((cls.model.create_time < create_time) | ((cls.model.create_time == create_time) & (cls.model.id < log_id)))
+            logs = logs.order_by(cls.model.create_time.desc(), cls.model.id.desc()).limit(batch_size)
+            with DB.connection_context():
+                rows = list(logs.dicts())
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            cursor = (rows[-1]["create_time"], rows[-1]["id"])
+
     @classmethod
     @DB.connection_context()
     def get_flagged_logs(cls, tenant_id: str = None, limit: int = 100, offset: int = 0):
@@ -143,15 +465,31 @@ class ChatLogService(CommonService):
         Returns:
             List of flagged ChatLog instances
         """
-        query_args = {"is_flagged": True}
+        logs = cls.model.select().where(cls.model.is_flagged == True)  # noqa: E712
         if tenant_id:
-            query_args["tenant_id"] = tenant_id
-            
-        return cls.query(
-            **query_args,
-            order_by=cls.model.create_time,
-            reverse=True
-        )[:limit] if limit else cls.query(**query_args, order_by=cls.model.create_time, reverse=True)
+            logs = logs.where(cls.model.tenant_id == tenant_id)
+        
+        logs = logs.order_by(cls.model.create_time.desc()).offset(offset)
+        if limit:
+            logs = logs.limit(limit)
+        return list(logs)
+
+    @classmethod
+    @DB.connection_context()
+    def count_flagged_logs(cls, tenant_id: str = None):
+        """
+        Count flagged chat logs without loading them
+        
+        Args:
+            tenant_id: Filter by tenant ID (optional)
+        
+        Returns:
+            Number of flagged logs
+        """
+        logs = cls.model.select(cls.model.id).where(cls.model.is_flagged == True)  # noqa: E712
+        if tenant_id:
+            logs = logs.where(cls.model.tenant_id == tenant_id)
+        return logs.count()
 
     @classmethod
     @DB.connection_context()
@@ -167,34 +505,49 @@ class ChatLogService(CommonService):
         Returns:
             List of ChatLog instances
         """
-        query_args = {"user_id": user_id}
+        logs = cls.model.select().where(cls.model.user_id == user_id)
         if tenant_id:
-            query_args["tenant_id"] = tenant_id
-            
-        return cls.query(
-            **query_args,
-            order_by=cls.model.create_time,
-            reverse=True
-        )[:limit] if limit else cls.query(**query_args, order_by=cls.model.create_time, reverse=True)
+            logs = logs.where(cls.model.tenant_id == tenant_id)
+        
+        logs = logs.order_by(cls.model.create_time.desc())
+        if limit:
+            logs = logs.limit(limit)
+        return list(logs)
 
     @classmethod
     @DB.connection_context()
-    def get_logs_by_conversation(cls, conversation_id: str):
+    def get_logs_by_conversation(cls, conversation_id: str, tenant_id: str):
         """
-        Get chat logs for a specific conversation
+        Get chat logs for a specific conversation within a tenant
         
         Args:
             conversation_id: Conversation ID
+            tenant_id: Tenant ID
         
         Returns:
             List of ChatLog instances
         """
         return cls.query(
             conversation_id=conversation_id,
+            tenant_id=tenant_id,
             order_by=cls.model.create_time,
             reverse=False
         )
 
+    @classmethod
+    @DB.connection_context()
+    def conversation_has_logs(cls, conversation_id: str):
+        """
+        Check whether any tenant has chat logs for a conversation
+        
+        Args:
+            conversation_id: Conversation ID
+        
+        Returns:
+            Boolean indicating whether a log exists
+        """
+        return cls.model.select().where(cls.model.conversation_id == conversation_id).exists()
+
     @classmethod
     @DB.connection_context()
     def get_statistics(cls, tenant_id: str = None, start_date: datetime = None, end_date: datetime = None):
@@ -207,31 +560,45 @@ class ChatLogService(CommonService):
             end_date: End date filter (optional)
         
         Returns:
-            Dict with statistics
+            Dict with statistics, including a per-day breakdown under "daily"
         """
-        query_args = {}
+        filters = []
         if tenant_id:
-            query_args["tenant_id"] = tenant_id
-            
-        all_logs = cls.query(**query_args)
-        
-        if start_date or end_date:
-            filtered_logs = []
-            for log in all_logs:
-                log_date = log.create_time
-                if start_date and log_date < start_date:
-                    continue
-                if end_date and log_date > end_date:
-                    continue
-                filtered_logs.append(log)
-            all_logs = filtered_logs
-        
-        total_logs = len(all_logs)
-        flagged_logs = len([log for log in all_logs if log.is_flagged])
+            filters.append(cls.model.tenant_id == tenant_id)
+        if start_date:
+            filters.append(cls.model.create_time >= int(start_date.timestamp() * 1000))
+        if end_date:
+            filters.append(cls.model.create_time <= int(end_date.timestamp() * 1000))
+        
+        # One GROUP BY query, the totals are summed over the per-day rows
+        day = cls.model.create_date.truncate("day")
+        query = cls.model.select(
+            day.alias("date"),
+            fn.COUNT(cls.model.id).alias("total_logs"),
+            fn.SUM(Case(None, [(cls.model.is_flagged == True, 1)], 0)).alias("flagged_logs"),  # noqa: E712
+            fn.SUM(Case(None, [(cls.model.flag_reason == "out of scope", 1)], 0)).alias("out_of_scope_logs"),
+            fn.SUM(cls.model.tokens_used).alias("tokens_used"),
+            fn.SUM(cls.model.response_time).alias("response_time")
+        )
+        if filters:
+            query = query.where(*filters)
+        
+        daily = []
+        total_logs = flagged_logs = total_tokens = total_response_time = 0
+        for row in query.group_by(day).order_by(day).dicts():
+            total_logs += row["total_logs"]
+            flagged_logs += int(row["flagged_logs"] or 0)
+            total_tokens += int(row["tokens_used"] or 0)
+            total_response_time += float(row["response_time"] or 0)
+            daily.append({
+                "date": row["date"],
+                "total_logs": row["total_logs"],
+                "flagged_logs": int(row["flagged_logs"] or 0),
+                "out_of_scope_logs": int(row["out_of_scope_logs"] or 0),
+            })
         normal_logs = total_logs - flagged_logs
         
-        total_tokens = sum(log.tokens_used for log in all_logs)
-        avg_response_time = sum(log.response_time for log in all_logs) / total_logs if total_logs > 0 else 0
+        avg_response_time = total_response_time / total_logs if total_logs > 0 else 0
         
         return {
             "total_logs": total_logs,
@@ -240,6 +607,7 @@ class ChatLogService(CommonService):
             "flagged_percentage": (flagged_logs / total_logs * 100) if total_logs > 0 else 0,
             "total_tokens_used": total_tokens,
             "average_response_time": avg_response_time,
+            "daily": daily,
         }
 
     @classmethod
@@ -260,10 +628,10 @@ class ChatLogService(CommonService):
         update_data = {
             "response": response,
             "tokens_used": tokens_used,
-            "response_time": response_time,
-            "update_time": current_timestamp()
+            "response_time": response_time
         }
         
+        # update_by_id stamps update_time/update_date itself
         return cls.update_by_id(log_id, update_data)
 
     @classmethod
@@ -291,36 +659,42 @@ class ChatLogService(CommonService):
         Returns:
             Boolean indicating success
         """
-        logging.info(f"CHAT LOG SERVICE - Updating log {log_id} with flagging data:")
-        logging.info(f"CHAT LOG SERVICE - response: {response}")
-        logging.info(f"CHAT LOG SERVICE - is_flagged: {is_flagged}")
-        logging.info(f"CHAT LOG SERVICE - flag_reason: {flag_reason}")
-        
         update_data = {
             "response": response,
             "is_flagged": is_flagged,
             "flag_reason": flag_reason,
             "log_type": "flagged" if is_flagged else "normal",
             "response_time": response_time,
-            "tokens_used": tokens_used,
-            "update_time": current_timestamp()
+            "tokens_used": tokens_used
         }
         
-        logging.info(f"CHAT LOG SERVICE - Update data: {update_data}")
+        # update_by_id stamps update_time/update_date itself
         result = cls.update_by_id(log_id, update_data)
-        logging.info(f"CHAT LOG SERVICE - Update result: {result}")
+        # Lazy %-formatting: update_data carries the full response text
+        logging.debug("CHAT LOG SERVICE - Updated log %s with flagging data %s, result: %s", log_id, update_data, result)
         return result
 
     @classmethod
     @DB.connection_context()
-    def delete_all_logs(cls, tenant_id: str):
+    def delete_all_logs(cls, tenant_id: str, batch_size: int = 1000):
         """
-        Delete all chat logs for a tenant
+        Delete all chat logs for a tenant, in batches committed one at a time
+        so a large tenant does not hold row locks for one huge DELETE
         
         Args:
             tenant_id: Tenant ID
+            batch_size: Number of records deleted per batch
             
         Returns:
             Number of deleted records
         """
-        return cls.filter_delete({"tenant_id": tenant_id})
\ No newline at end of file
+        deleted_count = 0
+        while True:
+            ids = [row[0] for row in cls.model.select(cls.model.id).where(cls.model.tenant_id == tenant_id).limit(batch_size).tuples()]
+            if not ids:
+                break
+            deleted_count += cls.delete_by_ids(ids)
+        
+        with _TOTALS_CACHE_LOCK:
+            _TOTALS_CACHE.clear()
+        return deleted_count
\ No newline at end of file
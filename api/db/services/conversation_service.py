@@ -13,15 +13,15 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import logging
 import time
 from uuid import uuid4
 from api.db import StatusEnum
 from api.db.db_models import Conversation, DB
 from api.db.services.api_service import API4ConversationService
 from api.db.services.common_service import CommonService
-from api.db.services.dialog_service import DialogService, chat, get_models
+from api.db.services.dialog_service import DialogService, chat, detect_language, get_chat_model, translate_to_english
 from api.utils import get_uuid
-from langdetect import detect
 import json
 
 from rag.prompts import chunks_format
@@ -32,7 +32,7 @@ class ConversationService(CommonService):
 
     @classmethod
     @DB.connection_context()
-    def get_list(cls, dialog_id, page_number, items_per_page, orderby, desc, id, name, user_id=None):
+    def get_list(cls, dialog_id, page_number, items_per_page, orderby, desc, id, name, user_id=None, cursor=None):
         sessions = cls.model.select().where(cls.model.dialog_id == dialog_id)
         if id:
             sessions = sessions.where(cls.model.id == id)
@@ -40,25 +40,47 @@ class ConversationService(CommonService):
             sessions = sessions.where(cls.model.name == name)
         if user_id:
             sessions = sessions.where(cls.model.user_id == user_id)
+        order_field = cls.model.getter_by(orderby)
         if desc:
-            sessions = sessions.order_by(cls.model.getter_by(orderby).desc())
+            sessions = sessions.order_by(order_field.desc(), cls.model.id.desc())
         else:
-            sessions = sessions.order_by(cls.model.getter_by(orderby).asc())
-
-        sessions = sessions.paginate(page_number, items_per_page)
+            sessions = sessions.order_by(order_field.asc(), cls.model.id.asc())
+
+        # cursor is (orderby value, id) of the last session already returned;
+        # seeking past it avoids scanning and discarding OFFSET rows on deep pages
+        if cursor:
+            cursor_value, cursor_id = cursor
+            if desc:
+                sessions = sessions.where((order_field < cursor_value) | ((order_field == cursor_value) & (cls.model.id < cursor_id)))
+            else:
+                sessions = sessions.where((order_field > cursor_value) | ((order_field == cursor_value) & (cls.model.id > cursor_id)))
+            sessions = sessions.limit(items_per_page)
+        else:
+            sessions = sessions.paginate(page_number, items_per_page)
 
         return list(sessions.dicts())
 
 
-def structure_answer(conv, ans, message_id, session_id):
+def _retrieval_question(dia, question):
+    """The question translated to English for knowledge retrieval, or the original one."""
+    detected_lang = detect_language(question)
+    if not detected_lang or detected_lang == "en":
+        return question
+    try:
+        return translate_to_english(get_chat_model(dia), question, dia.llm_setting)
+    except Exception as e:
+        logging.warning(f"Auto-translation failed: {e}, using original question")
+        return question
+
+
+def structure_answer(conv, ans, message_id, session_id, chunks_formatted=False):
     reference = ans["reference"]
     if not isinstance(reference, dict):
         reference = {}
         ans["reference"] = {}
 
-    chunk_list = chunks_format(reference)
-
-    reference["chunks"] = chunk_list
+    if not chunks_formatted:
+        reference["chunks"] = chunks_format(reference)
     ans["id"] = message_id
     ans["session_id"] = session_id
 
@@ -110,29 +132,10 @@ def completion(tenant_id, chat_id, question, name="New session", session_id=None
 
     conv = conv[0]
     msg = []
+    e, dia = DialogService.get_by_id(conv.dialog_id)
 
-    # Detect language and translate if needed for knowledge retrieval using chatbot
-    detected_lang = None
-    translated_question = question
-    try:
-        detected_lang = detect(question)
-    except Exception:
-        detected_lang = None
-
-    if detected_lang and detected_lang != "en":
-        # Use the chat model to translate the question to English
-        e, dia = DialogService.get_by_id(chat_id, tenant_id=tenant_id)
-        _, _, _, chat_mdl, _ = get_models(dia)
-        translation_prompt = f"Translate the following text to English, only return the translated text, no explanation.\n\nText: {question}"
-        try:
-            # Use the chat model's chat method for translation
-            translation_result = chat_mdl.chat("", [{"role": "user", "content": translation_prompt}], dia.llm_setting)
-            if isinstance(translation_result, dict) and "answer" in translation_result:
-                translated_question = translation_result["answer"]
-            elif isinstance(translation_result, str):
-                translated_question = translation_result
-        except Exception:
-            translated_question = question
+    # Translate non-English questions for knowledge retrieval
+    translated_question = _retrieval_question(dia, question)
 
     question_obj = {
         "content": question,
@@ -147,22 +150,24 @@ def completion(tenant_id, chat_id, question, name="New session", session_id=None
             continue
         msg.append(m)
     message_id = msg[-1].get("id")
-    e, dia = DialogService.get_by_id(conv.dialog_id)
 
     kb_ids = kwargs.get("kb_ids",[])
-    dia.kb_ids = list(set(dia.kb_ids + kb_ids))
+    # Order-preserving dedup keeps retrieval (and the prompt) stable across calls
+    dia.kb_ids = list(dict.fromkeys([*dia.kb_ids, *kb_ids]))
     if not conv.reference:
         conv.reference = []
     conv.message.append({"role": "assistant", "content": "", "id": message_id})
     conv.reference.append({"chunks": [], "doc_aggs": []})
 
     # Use translated_question for knowledge retrieval, but keep original for message
+    retrieval_msg = msg[:-1]
+    retrieval_msg.append({"role": "user", "content": translated_question, "id": msg[-1]["id"]})
     if stream:
         try:
-            for ans in chat(dia, msg[:-1] + [{"role": "user", "content": translated_question, "id": msg[-1]["id"]}], True, **kwargs):
+            for ans in chat(dia, retrieval_msg, True, **kwargs):
                 ans = structure_answer(conv, ans, message_id, session_id)
                 yield "data:" + json.dumps({"code": 0, "data": ans}, ensure_ascii=False) + "\n\n"
-            ConversationService.update_by_id(conv.id, conv.to_dict())
+            ConversationService.update_by_id(conv.id, {"message": conv.message, "reference": conv.reference})
         except Exception as e:
             yield "data:" + json.dumps({"code": 500, "message": str(e),
                                         "data": {"answer": "**ERROR**: " + str(e), "reference": []}},
@@ -171,10 +176,12 @@ def completion(tenant_id, chat_id, question, name="New session", session_id=None
 
     else:
         answer = None
-        for ans in chat(dia, msg[:-1] + [{"role": "user", "content": translated_question, "id": msg[-1]["id"]}], False, **kwargs):
+        for ans in chat(dia, retrieval_msg, False, **kwargs):
             answer = structure_answer(conv, ans, message_id, session_id)
-            ConversationService.update_by_id(conv.id, conv.to_dict())
             break
+        # One write per turn, after the answer is in place
+        if answer is not None:
+            ConversationService.update_by_id(conv.id, {"message": conv.message, "reference": conv.reference})
         yield answer
 
 
@@ -210,26 +217,8 @@ def iframe_completion(dialog_id, question, session_id=None, stream=False, **kwar
         conv.message = []
     messages = conv.message
 
-    # Detect language and translate if needed for knowledge retrieval using chatbot
-    detected_lang = None
-    translated_question = question
-    try:
-        detected_lang = detect(question)
-    except Exception:
-        detected_lang = None
-
-    if detected_lang and detected_lang != "en":
-        # Use the chat model to translate the question to English
-        _, _, _, chat_mdl, _ = get_models(dia)
-        translation_prompt = f"Translate the following text to English, only return the translated text, no explanation.\n\nText: {question}"
-        try:
-            translation_result = chat_mdl.chat("", [{"role": "user", "content": translation_prompt}], dia.llm_setting)
-            if isinstance(translation_result, dict) and "answer" in translation_result:
-                translated_question = translation_result["answer"]
-            elif isinstance(translation_result, str):
-                translated_question = translation_result
-        except Exception:
-            translated_question = question
+    # Translate non-English questions for knowledge retrieval
+    translated_question = _retrieval_question(dia, question)
 
     question_obj = {
         "role": "user",
@@ -254,13 +243,15 @@ def iframe_completion(dialog_id, question, session_id=None, stream=False, **kwar
     conv.reference.append({"chunks": [], "doc_aggs": []})
 
     # Use translated_question for knowledge retrieval, but keep original for message
+    retrieval_msg = msg[:-1]
+    retrieval_msg.append({"role": "user", "content": translated_question, "id": msg[-1]["id"]})
     if stream:
         try:
-            for ans in chat(dia, msg[:-1] + [{"role": "user", "content": translated_question, "id": msg[-1]["id"]}], True, **kwargs):
+            for ans in chat(dia, retrieval_msg, True, **kwargs):
                 ans = structure_answer(conv, ans, message_id, session_id)
                 yield "data:" + json.dumps({"code": 0, "message": "", "data": ans},
                                            ensure_ascii=False) + "\n\n"
-            API4ConversationService.append_message(conv.id, conv.to_dict())
+            API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
         except Exception as e:
             yield "data:" + json.dumps({"code": 500, "message": str(e),
                                         "data": {"answer": "**ERROR**: " + str(e), "reference": []}},
@@ -269,8 +260,10 @@ def iframe_completion(dialog_id, question, session_id=None, stream=False, **kwar
 
     else:
         answer = None
-        for ans in chat(dia, msg[:-1] + [{"role": "user", "content": translated_question, "id": msg[-1]["id"]}], False, **kwargs):
+        for ans in chat(dia, retrieval_msg, False, **kwargs):
             answer = structure_answer(conv, ans, message_id, session_id)
-            API4ConversationService.append_message(conv.id, conv.to_dict())
             break
+        # One write per turn, after the answer is in place
+        if answer is not None:
+            API4ConversationService.append_message(conv.id, {"message": conv.message, "reference": conv.reference})
         yield answer
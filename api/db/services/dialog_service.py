@@ -16,16 +16,19 @@
 import binascii
 import logging
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import datetime
-from functools import partial
+from functools import lru_cache, partial
 from timeit import default_timer as timer
 
 import trio
+from cachetools import TTLCache
 from langfuse import Langfuse
 from peewee import fn
-from langdetect import detect
+from langdetect import DetectorFactory, detect
 
 from agentic_reasoning import DeepResearcher
 from api import settings
@@ -128,6 +131,26 @@ class DialogService(CommonService):
                 data["update_date"] = datetime_format(datetime.now())
                 cls.model.update(data).where(cls.model.id == data["id"]).execute()
 
+    @classmethod
+    @DB.connection_context()
+    def query_by_tenants(cls, tenant_ids, dialog_ids, cols=None):
+        """Fetch the dialogs among dialog_ids that belong to any of tenant_ids.
+
+        Args:
+            tenant_ids (list): Tenant IDs the caller is a member of.
+            dialog_ids (str | list): A dialog ID or a list of dialog IDs.
+            cols (list, optional): Columns to select. If None, selects all columns.
+
+        Returns:
+            list: Matching Dialog records, fetched in a single query.
+        """
+        if isinstance(dialog_ids, str):
+            dialog_ids = [dialog_ids]
+        if not tenant_ids or not dialog_ids:
+            return []
+        dialogs = cls.model.select(*cols) if cols else cls.model.select()
+        return list(dialogs.where(cls.model.tenant_id.in_(tenant_ids), cls.model.id.in_(dialog_ids)))
+
     @classmethod
     @DB.connection_context()
     def get_list(cls, tenant_id, page_number, items_per_page, orderby, desc, id, name):
@@ -207,7 +230,60 @@ class DialogService(CommonService):
         return list(dialogs.dicts()), count
 
 
-def chat_solo(dialog, messages, stream=True):
+def prompt_cache_kwargs(chat_mdl, prompt_cache_key):
+    """Forward prompt_cache_key only to providers that understand it."""
+    if prompt_cache_key and getattr(chat_mdl.mdl, "_SUPPORT_PROMPT_CACHE_KEY", False):
+        return {"prompt_cache_key": prompt_cache_key}
+    return {}
+
+
+# Deterministic detection: the same question always takes the same path
+DetectorFactory.seed = 0
+
+
+@lru_cache(maxsize=4096)
+def detect_language(text):
+    """
+    Language code of text, or None when it cannot be detected. Plain ASCII
+    is treated as English without running langdetect's n-gram scoring.
+    """
+    if text.isascii():
+        return "en"
+    try:
+        return detect(text)
+    except Exception:
+        return None
+
+
+_TRANSLATION_CACHE = TTLCache(maxsize=4096, ttl=3600)
+_TRANSLATION_CACHE_LOCK = threading.Lock()
+
+
+def translate_to_english(chat_mdl, text, gen_conf=None):
+    """
+    Translate text to English with chat_mdl for retrieval. Translations are
+    cached per tenant and model; LLM errors propagate to the caller.
+    """
+    key = (chat_mdl.tenant_id, chat_mdl.llm_name, text)
+    with _TRANSLATION_CACHE_LOCK:
+        translated = _TRANSLATION_CACHE.get(key)
+    if translated is not None:
+        return translated
+
+    translation_prompt = f"Translate the following text to English, only return the translated text, no explanation.\n\nText: {text}"
+    translation_result = chat_mdl.chat("", [{"role": "user", "content": translation_prompt}], gen_conf if gen_conf is not None else {"temperature": 0.2})
+    if isinstance(translation_result, dict) and "answer" in translation_result:
+        translated = translation_result["answer"]
+    elif isinstance(translation_result, str):
+        translated = translation_result
+    else:
+        return text
+    with _TRANSLATION_CACHE_LOCK:
+        _TRANSLATION_CACHE[key] = translated
+    return translated
+
+
+def chat_solo(dialog, messages, stream=True, prompt_cache_key=None):
     if TenantLLMService.llm_id2llm_type(dialog.llm_id) == "image2text":
         chat_mdl = LLMBundle(dialog.tenant_id, LLMType.IMAGE2TEXT, dialog.llm_id)
     else:
@@ -218,10 +294,11 @@ def chat_solo(dialog, messages, stream=True):
     if prompt_config.get("tts"):
         tts_mdl = LLMBundle(dialog.tenant_id, LLMType.TTS)
     msg = [{"role": m["role"], "content": re.sub(r"##\d+\$\$", "", m["content"])} for m in messages if m["role"] != "system"]
+    cache_kwargs = prompt_cache_kwargs(chat_mdl, prompt_cache_key)
     if stream:
         last_ans = ""
         delta_ans = ""
-        for ans in chat_mdl.chat_streamly(prompt_config.get("system", ""), msg, dialog.llm_setting):
+        for ans in chat_mdl.chat_streamly(prompt_config.get("system", ""), msg, dialog.llm_setting, **cache_kwargs):
             answer = ans
             delta_ans = ans[len(last_ans) :]
             if num_tokens_from_string(delta_ans) < 16:
@@ -232,12 +309,37 @@ def chat_solo(dialog, messages, stream=True):
         if delta_ans:
             yield {"answer": answer, "reference": {}, "audio_binary": tts(tts_mdl, delta_ans), "prompt": "", "created_at": time.time()}
     else:
-        answer = chat_mdl.chat(prompt_config.get("system", ""), msg, dialog.llm_setting)
+        answer = chat_mdl.chat(prompt_config.get("system", ""), msg, dialog.llm_setting, **cache_kwargs)
         user_content = msg[-1].get("content", "[content not available]")
         logging.debug("User: {}|Assistant: {}".format(user_content, answer))
         yield {"answer": answer, "reference": {}, "audio_binary": tts(tts_mdl, answer), "prompt": "", "created_at": time.time()}
 
 
+# Single-turn questions are translated here while chat() loads its models
+_TRANSLATION_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="question_translation")
+
+
+def _translate_question(dialog, question):
+    return translate_to_english(get_chat_model(dialog), question)
+
+
+def _submit_translation(dialog, question):
+    """
+    Start translating a non-English question to English for retrieval.
+    Returns None when the question needs no translation.
+    """
+    detected_lang = detect_language(question)
+    if not detected_lang or detected_lang == "en":
+        return None
+    return _TRANSLATION_EXECUTOR.submit(_translate_question, dialog, question)
+
+
+def get_chat_model(dialog):
+    if TenantLLMService.llm_id2llm_type(dialog.llm_id) == "image2text":
+        return LLMBundle(dialog.tenant_id, LLMType.IMAGE2TEXT, dialog.llm_id)
+    return LLMBundle(dialog.tenant_id, LLMType.CHAT, dialog.llm_id)
+
+
 def get_models(dialog):
     embd_mdl, chat_mdl, rerank_mdl, tts_mdl = None, None, None, None
     kbs = KnowledgebaseService.get_by_ids(dialog.kb_ids)
@@ -250,10 +352,7 @@ def get_models(dialog):
         if not embd_mdl:
             raise LookupError("Embedding model(%s) not found" % embedding_list[0])
 
-    if TenantLLMService.llm_id2llm_type(dialog.llm_id) == "image2text":
-        chat_mdl = LLMBundle(dialog.tenant_id, LLMType.IMAGE2TEXT, dialog.llm_id)
-    else:
-        chat_mdl = LLMBundle(dialog.tenant_id, LLMType.CHAT, dialog.llm_id)
+    chat_mdl = get_chat_model(dialog)
 
     if dialog.rerank_id:
         rerank_mdl = LLMBundle(dialog.tenant_id, LLMType.RERANK, dialog.rerank_id)
@@ -344,12 +443,18 @@ def meta_filter(metas: dict, filters: list[dict]):
 def chat(dialog, messages, stream=True, **kwargs):
     assert messages[-1]["role"] == "user", "The last content of this conversation is not from user."
     if not dialog.kb_ids and not dialog.prompt_config.get("tavily_api_key"):
-        for ans in chat_solo(dialog, messages, stream):
+        for ans in chat_solo(dialog, messages, stream, prompt_cache_key=kwargs.get("prompt_cache_key")):
             yield ans
         return
 
     chat_start_ts = timer()
 
+    # Unless multiturn refinement rewrites it, the question to retrieve with is
+    # known up front, so its translation overlaps the model and field map setup
+    translation = None
+    if not (len([m for m in messages if m["role"] == "user"]) > 1 and dialog.prompt_config.get("refine_multiturn")):
+        translation = _submit_translation(dialog, messages[-1]["content"])
+
     if TenantLLMService.llm_id2llm_type(dialog.llm_id) == "image2text":
         llm_model_config = TenantLLMService.get_model_config(dialog.tenant_id, LLMType.IMAGE2TEXT, dialog.llm_id)
     else:
@@ -407,26 +512,18 @@ def chat(dialog, messages, stream=True, **kwargs):
 
     # Automatic language detection and translation for non-English queries
     original_question = questions[0]
-    detected_lang = None
-    try:
-        detected_lang = detect(questions[0])
-    except Exception:
-        detected_lang = None
+    detected_lang = detect_language(questions[0])
 
-    if detected_lang and detected_lang != "en":
+    if translation is not None:
+        try:
+            questions = [translation.result()]
+        except Exception as e:
+            logging.warning(f"Auto-translation failed: {e}, using original question")
+    elif detected_lang and detected_lang != "en":
         # Translate question to English for better retrieval
-        translation_prompt = f"Translate the following text to English, only return the translated text, no explanation.\n\nText: {questions[0]}"
         try:
-            translation_result = chat_mdl.chat("", [{"role": "user", "content": translation_prompt}], {"temperature": 0.2})
-            if isinstance(translation_result, dict) and "answer" in translation_result:
-                translated_question = translation_result["answer"]
-            elif isinstance(translation_result, str):
-                translated_question = translation_result
-            else:
-                translated_question = questions[0]
-            
             # Use translated question for retrieval
-            questions = [translated_question]
+            questions = [translate_to_english(chat_mdl, questions[0])]
             
             # Store original question for response context
             # (The response will be generated considering the original language context)
@@ -552,6 +649,7 @@ def chat(dialog, messages, stream=True, **kwargs):
             "reference": kbinfos,
             "prompt": "\n\n### Query:\n%s" % question_text,
             "is_flagged": False,
+            "is_normal": True,
             "question": question_text
         }
         logging.info(f"NORMAL CONVERSATION - Question: {question_text}, Answer: {friendly_response}")
@@ -694,10 +792,11 @@ def chat(dialog, messages, stream=True, **kwargs):
             trace_context=trace_context, name="chat", model=llm_model_config["llm_name"], input={"prompt": prompt, "prompt4citation": prompt4citation, "messages": msg}
         )
 
+    cache_kwargs = prompt_cache_kwargs(chat_mdl, kwargs.get("prompt_cache_key"))
     if stream:
         last_ans = ""
         answer = ""
-        for ans in chat_mdl.chat_streamly(prompt + prompt4citation, msg[1:], gen_conf):
+        for ans in chat_mdl.chat_streamly(prompt + prompt4citation, msg[1:], gen_conf, **cache_kwargs):
             if thought:
                 ans = re.sub(r"^.*</think>", "", ans, flags=re.DOTALL)
             answer = ans
@@ -711,7 +810,7 @@ def chat(dialog, messages, stream=True, **kwargs):
             yield {"answer": thought + answer, "reference": {}, "audio_binary": tts(tts_mdl, delta_ans)}
         yield decorate_answer(thought + answer)
     else:
-        answer = chat_mdl.chat(prompt + prompt4citation, msg[1:], gen_conf)
+        answer = chat_mdl.chat(prompt + prompt4citation, msg[1:], gen_conf, **cache_kwargs)
         user_content = msg[-1].get("content", "[content not available]")
         logging.debug("User: {}|Assistant: {}".format(user_content, answer))
         res = decorate_answer(answer)
@@ -838,7 +937,7 @@ def tts(tts_mdl, text):
     return binascii.hexlify(bin).decode("utf-8")
 
 
-def ask(question, kb_ids, tenant_id, chat_llm_name=None, search_config={}):
+def ask(question, kb_ids, tenant_id, chat_llm_name=None, search_config={}, prompt_cache_key=None):
     doc_ids = search_config.get("doc_ids", [])
     rerank_mdl = None
     kb_ids = search_config.get("kb_ids", kb_ids)
@@ -911,7 +1010,7 @@ def ask(question, kb_ids, tenant_id, chat_llm_name=None, search_config={}):
         return {"answer": answer, "reference": refs}
 
     answer = ""
-    for ans in chat_mdl.chat_streamly(sys_prompt, msg, {"temperature": 0.1}):
+    for ans in chat_mdl.chat_streamly(sys_prompt, msg, {"temperature": 0.1}, **prompt_cache_kwargs(chat_mdl, prompt_cache_key)):
         answer = ans
         yield {"answer": answer, "reference": {}}
     yield decorate_answer(answer)
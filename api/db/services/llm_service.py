@@ -13,14 +13,20 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import copy
 import inspect
 import logging
 import re
+import threading
 from functools import partial
 from typing import Generator
+
+from cachetools import TTLCache
+from api.db import LLMType
 from api.db.db_models import LLM
 from api.db.services.common_service import CommonService
 from api.db.services.tenant_llm_service import LLM4Tenant, TenantLLMService
+from api.db.services.user_service import TenantService
 
 
 class LLMService(CommonService):
@@ -82,6 +88,47 @@ def get_init_tenant_llm(user_id):
     return list(unique.values())
 
 
+# Process-local bundles for stateless calls (no tools bound), so endpoints like
+# tts or related_questions skip the model config lookups and client setup.
+# Entries are keyed on the resolved model name, so a changed tenant default
+# is a different key; callers get a shallow copy sharing the model client
+# with a trace of their own
+_BUNDLE_CACHE = TTLCache(maxsize=512, ttl=300)
+_BUNDLE_CACHE_LOCK = threading.Lock()
+
+_TENANT_DEFAULT_MODEL_FIELDS = {
+    LLMType.EMBEDDING.value: "embd_id",
+    LLMType.SPEECH2TEXT.value: "asr_id",
+    LLMType.IMAGE2TEXT.value: "img2txt_id",
+    LLMType.CHAT.value: "llm_id",
+    LLMType.RERANK.value: "rerank_id",
+    LLMType.TTS.value: "tts_id",
+}
+
+
+def get_cached_llm_bundle(tenant_id, llm_type, llm_name=None):
+    if not llm_name:
+        e, tenant = TenantService.get_by_id(tenant_id)
+        if e:
+            llm_name = getattr(tenant, _TENANT_DEFAULT_MODEL_FIELDS.get(llm_type, ""), None)
+    key = (tenant_id, llm_type, llm_name)
+    with _BUNDLE_CACHE_LOCK:
+        bundle = _BUNDLE_CACHE.get(key)
+    if bundle is None:
+        bundle = LLMBundle(tenant_id, llm_type, llm_name)
+        with _BUNDLE_CACHE_LOCK:
+            _BUNDLE_CACHE[key] = bundle
+    bundle = copy.copy(bundle)
+    if bundle.langfuse:
+        bundle.trace_context = {"trace_id": bundle.langfuse.create_trace_id()}
+    return bundle
+
+
+def clear_llm_bundle_cache():
+    with _BUNDLE_CACHE_LOCK:
+        _BUNDLE_CACHE.clear()
+
+
 class LLMBundle(LLM4Tenant):
     def __init__(self, tenant_id, llm_type, llm_name=None, lang="Chinese", **kwargs):
         super().__init__(tenant_id, llm_type, llm_name, lang, **kwargs)
@@ -274,4 +274,10 @@ class UserTenantService(CommonService):
             ).first()
             return user_tenant
         except peewee.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
+
+    @classmethod
+    @DB.connection_context()
+    def first_tenant_id(cls, user_id):
+        """Return the tenant_id of the user's first tenant membership, or None."""
+        return cls.model.select(cls.model.tenant_id).where(cls.model.user_id == user_id).limit(1).scalar()
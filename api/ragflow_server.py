@@ -20,7 +20,7 @@
 
 from api.utils.log_utils import init_root_logger
 from plugin import GlobalPluginManager
-init_root_logger("ragflow_server")
+init_root_logger("ragflow_server", use_queue=True)
 
 import logging
 import os
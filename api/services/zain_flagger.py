@@ -13,18 +13,61 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import hashlib
+import re
+import threading
 from typing import Dict, Tuple, List, Optional
 
+from cachetools import TTLCache
+
 from api.db.services.llm_service import LLMBundle
 from api.db import LLMType
 
+# Document names per set of knowledge bases, shared by all flagger instances
+_DOC_NAMES_CACHE = TTLCache(maxsize=512, ttl=300)
+_DOC_NAMES_CACHE_LOCK = threading.Lock()
+
+# ALLOW/FLAG verdicts per tenant, model, knowledge bases and normalized question
+_VERDICT_CACHE = TTLCache(maxsize=10_000, ttl=3600)
+_VERDICT_CACHE_LOCK = threading.Lock()
+
+# Terminology that only occurs in the knowledge base's domains; a hit is
+# answerable without asking the LLM
+IN_SCOPE_TERMS = (
+    "ifrs 15", "ifrs 9", "ifrs", "ias 16",
+    "revenue recognition", "expected credit loss", "ecl",
+    "receivable", "receivables", "provisioning", "ageing bucket", "aging bucket",
+    "depreciation", "capitalization", "capitalisation",
+    "fixed asset", "fixed asset register", "asset retirement", "asset item code",
+    "mobinet",
+)
+_IN_SCOPE_RE = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in sorted(IN_SCOPE_TERMS, key=len, reverse=True)) + r")\b")
+
+_LLM_DECIDE_PROMPT = """You are reviewing a question for Zain Kuwait's finance knowledge base.
+
+Question: {question}
+
+Available documents: {doc_context}
+
+The knowledge base covers:
+- Revenue & Receivables Accounting (IFRS 15 & 9)
+- Fixed Asset Management (IAS 16)
+- Asset processes, depreciation, capitalization
+
+Respond with exactly one of these formats:
+ALLOW: reason
+FLAG: reason
+
+ALLOW if the question relates to revenue, receivables, fixed assets, depreciation, or capitalization.
+FLAG if the question is about other topics like people, weather, sports, or unrelated subjects."""
+
 
 class ZainContentFlagger:
     """LLM-only flagger to decide if a question can be answered from the Zain Kuwait knowledge base.
 
-    Removal notice:
-    - All keyword heuristics have been removed per requirement.
-    - Only the LLM decides (ALLOW vs FLAG) using provided domain context + available document names.
+    Decision rules:
+    - Keyword heuristics never flag: a question naming in-scope terminology (IN_SCOPE_TERMS) is allowed without an LLM call.
+    - Otherwise only the LLM decides (ALLOW vs FLAG) using provided domain context + available document names.
     - A question is flagged ONLY when it cannot be answered from the knowledge base scope.
     """
 
@@ -69,13 +112,18 @@ IN SCOPE examples (should be ALLOWED): questions about revenue recognition steps
         try:
             if not kb_ids:
                 return []
-            from api.db.services.document_service import DocumentService
-            names = []
-            for kb_id in kb_ids:
-                docs = DocumentService.query(kb_id=kb_id, status="1")
-                for d in docs:
-                    if getattr(d, "name", None):
-                        names.append(d.name)
+            key = tuple(sorted(kb_ids))
+            with _DOC_NAMES_CACHE_LOCK:
+                names = _DOC_NAMES_CACHE.get(key)
+            if names is not None:
+                return names
+            from api.db.db_models import DB, Document
+            # One query for all knowledge bases; tuples() skips model instantiation
+            with DB.connection_context():
+                rows = Document.select(Document.name).where(Document.kb_id.in_(key), Document.status == "1").tuples()
+                names = [name for name, in rows if name]
+            with _DOC_NAMES_CACHE_LOCK:
+                _DOC_NAMES_CACHE[key] = names
             return names
         except Exception:
             return []
@@ -90,27 +138,18 @@ IN SCOPE examples (should be ALLOWED): questions about revenue recognition steps
             print("DEBUG: No LLM bundle available, defaulting to ALLOW")
             return True, "LLM unavailable; default allow"
 
+        question_hash = hashlib.blake2b(question.strip().lower().encode("utf-8"), digest_size=16).hexdigest()
+        verdict_key = (self.tenant_id, self.llm_id, tuple(sorted(kb_ids or [])), question_hash)
+        with _VERDICT_CACHE_LOCK:
+            verdict = _VERDICT_CACHE.get(verdict_key)
+        if verdict is not None:
+            return verdict
+
         doc_names = self._get_document_names(kb_ids or [])
         doc_context = ("Available documents: " + ", ".join(doc_names[:12])) if doc_names else "(No document names retrieved)"
         print(f"DEBUG: Document context: {doc_context}")
 
-        prompt = f"""You are reviewing a question for Zain Kuwait's finance knowledge base.
-
-Question: {question}
-
-Available documents: {doc_context}
-
-The knowledge base covers:
-- Revenue & Receivables Accounting (IFRS 15 & 9)
-- Fixed Asset Management (IAS 16)
-- Asset processes, depreciation, capitalization
-
-Respond with exactly one of these formats:
-ALLOW: reason
-FLAG: reason
-
-ALLOW if the question relates to revenue, receivables, fixed assets, depreciation, or capitalization.
-FLAG if the question is about other topics like people, weather, sports, or unrelated subjects."""
+        prompt = _LLM_DECIDE_PROMPT.format(question=question, doc_context=doc_context)
 
         try:
             print("DEBUG: Calling LLM...")
@@ -127,25 +166,36 @@ FLAG if the question is about other topics like people, weather, sports, or unre
             print("DEBUG: Empty LLM response, defaulting to ALLOW for better UX")
             return True, "Empty LLM response, allowing question"
 
+        # Only parsed verdicts are cached; fallbacks are retried on the next ask
         upper = raw.upper()
+        verdict = None
         if upper.startswith("ALLOW:"):
             print("DEBUG: LLM decided ALLOW")
-            return True, raw.split(":", 1)[1].strip()
-        if upper.startswith("FLAG:"):
+            verdict = (True, raw.split(":", 1)[1].strip())
+        elif upper.startswith("FLAG:"):
             print("DEBUG: LLM decided FLAG")
-            return False, raw.split(":", 1)[1].strip()
+            verdict = (False, raw.split(":", 1)[1].strip())
+        if verdict is not None:
+            with _VERDICT_CACHE_LOCK:
+                _VERDICT_CACHE[verdict_key] = verdict
+            return verdict
         
         # Unparseable response - be more lenient and allow for better UX
         print("DEBUG: Unparseable LLM response, defaulting to ALLOW for better UX")
         return True, f"Unrecognized LLM response format, allowing: {raw}"
 
     def check_question(self, question: str, kb_ids=None, use_llm: bool = True) -> Dict:
-        is_answerable, reason = self._llm_decide(question, kb_ids if use_llm else [])
+        match = _IN_SCOPE_RE.search(question.lower())
+        if match:
+            is_answerable, reason, method = True, f"in-scope term '{match.group(0)}'", "keyword"
+        else:
+            is_answerable, reason = self._llm_decide(question, kb_ids if use_llm else [])
+            method = "llm_only"
         return {
             "is_related": is_answerable,
             "is_flagged": not is_answerable,
             "reason": ("Answerable from KB: " + reason) if is_answerable else ("Not answerable from KB: " + reason),
-            "method": "llm_only",
+            "method": method,
             "question": question,
             "response_message": None if is_answerable else "Your answer has been flagged"
         }
@@ -13,10 +13,12 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import atexit
 import os
 import os.path
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 initialized_root_logger = False
 
@@ -30,7 +32,7 @@ def get_project_base_directory():
     )
     return PROJECT_BASE
 
-def init_root_logger(logfile_basename: str, log_format: str = "%(asctime)-15s %(levelname)-8s %(process)d %(message)s"):
+def init_root_logger(logfile_basename: str, log_format: str = "%(asctime)-15s %(levelname)-8s %(process)d %(message)s", use_queue: bool = False):
     global initialized_root_logger
     if initialized_root_logger:
         return
@@ -51,6 +53,15 @@ def init_root_logger(logfile_basename: str, log_format: str = "%(asctime)-15s %(
     handler2.setFormatter(formatter)
     logger.addHandler(handler2)
 
+    if use_queue:
+        # Request threads only enqueue records; a listener thread does the file and stdout I/O
+        logger.handlers.clear()
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        listener = QueueListener(log_queue, handler1, handler2, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
     logging.captureWarnings(True)
 
     LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
@@ -0,0 +1,128 @@
+#
+#  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+"""
+Embedding-similarity cache for final chat answers.
+
+Each tenant + scope (a dialog, or a set of knowledge bases) owns one small
+Redis shard holding the most recent answers together with the normalized
+embedding of the question that produced them. A new question whose
+embedding is close enough to a cached one is answered from the shard
+instead of running retrieval and the LLM again.
+"""
+import base64
+import json
+import logging
+import time
+
+import numpy as np
+import xxhash
+
+from api.db import LLMType
+from api.db.services.knowledgebase_service import KnowledgebaseService
+from api.db.services.llm_service import LLMBundle
+from rag.utils.redis_conn import REDIS_CONN
+
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_MAX_TEMPERATURE = 0.3
+SEMANTIC_CACHE_TTL = 24 * 3600
+SEMANTIC_CACHE_MAX_ENTRIES = 64
+
+
+def temperature_allows_cache(llm_setting):
+    """Only near-deterministic generations are worth replaying"""
+    return float((llm_setting or {}).get("temperature", 0.1)) <= SEMANTIC_CACHE_MAX_TEMPERATURE
+
+
+def cache_key(tenant_id, scope):
+    hasher = xxhash.xxh64()
+    hasher.update(str(scope).encode("utf-8"))
+    return f"semantic_cache:{tenant_id}:{hasher.hexdigest()}"
+
+
+def embed_question(tenant_id, kb_ids, question):
+    """
+    Embed the question with the knowledge bases' embedding model, L2-normalized.
+    Returns None when the knowledge bases do not share a single embedding model.
+    """
+    kbs = KnowledgebaseService.get_by_ids(kb_ids)
+    embedding_list = list(set([kb.embd_id for kb in kbs]))
+    if len(embedding_list) != 1:
+        return None
+    embd_mdl = LLMBundle(tenant_id, LLMType.EMBEDDING, embedding_list[0])
+    vector, _ = embd_mdl.encode_queries(question)
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def _load(key):
+    bin = REDIS_CONN.get(key)
+    if not bin:
+        return []
+    try:
+        entries = json.loads(bin)
+    except Exception as e:
+        logging.warning(f"semantic cache {key} is corrupted: {e}")
+        return []
+    now = time.time()
+    return [e for e in entries if now - e.get("ts", 0) < SEMANTIC_CACHE_TTL]
+
+
+def _decode(vector):
+    return np.frombuffer(base64.b64decode(vector), dtype=np.float32)
+
+
+def lookup(key, vector, threshold=SEMANTIC_CACHE_THRESHOLD):
+    """
+    Return the cached {"answer", "reference", "is_flagged", "flag_reason"} closest
+    to vector, or None below threshold.
+    """
+    entries = _load(key)
+    if not entries:
+        return None
+    matrix = [_decode(e["vector"]) for e in entries]
+    candidates = [i for i, v in enumerate(matrix) if v.shape == vector.shape]
+    if not candidates:
+        return None
+    similarities = np.stack([matrix[i] for i in candidates]) @ vector
+    best = int(np.argmax(similarities))
+    if similarities[best] < threshold:
+        return None
+    entry = entries[candidates[best]]
+    return {
+        "answer": entry["answer"],
+        "reference": entry["reference"],
+        "is_flagged": entry.get("is_flagged", False),
+        "flag_reason": entry.get("flag_reason"),
+    }
+
+
+def store(key, vector, answer, reference, is_flagged=False, flag_reason=None):
+    """
+    Append an answer to the shard, keeping the newest SEMANTIC_CACHE_MAX_ENTRIES.
+    reference is stored as served, with its chunks already formatted.
+    """
+    entries = _load(key)
+    entries.append({
+        "vector": base64.b64encode(vector.astype(np.float32).tobytes()).decode("utf-8"),
+        "answer": answer,
+        "reference": reference,
+        "is_flagged": is_flagged,
+        "flag_reason": flag_reason,
+        "ts": time.time(),
+    })
+    entries = entries[-SEMANTIC_CACHE_MAX_ENTRIES:]
+    REDIS_CONN.set(key, json.dumps(entries, ensure_ascii=False), SEMANTIC_CACHE_TTL)
@@ -71,6 +71,9 @@ class ToolCallSession(Protocol):
 
 
 class Base(ABC):
+    # Providers that route on a prompt_cache_key to reuse a warm KV-cache for a shared prompt prefix
+    _SUPPORT_PROMPT_CACHE_KEY = False
+
     def __init__(self, key, model_name, base_url, **kwargs):
         timeout = int(os.environ.get("LM_TIMEOUT_SECONDS", 600))
         self.client = OpenAI(api_key=key, base_url=base_url, timeout=timeout)
@@ -116,8 +119,14 @@ class Base(ABC):
 
     def _chat(self, history, gen_conf, **kwargs):
         logging.info("[HISTORY]" + json.dumps(history, ensure_ascii=False, indent=2))
+        extra_body = {}
+        prompt_cache_key = kwargs.pop("prompt_cache_key", None)
+        if prompt_cache_key:
+            extra_body["prompt_cache_key"] = prompt_cache_key
         if self.model_name.lower().find("qwen3") >= 0:
-            kwargs["extra_body"] = {"enable_thinking": False}
+            extra_body["enable_thinking"] = False
+        if extra_body:
+            kwargs["extra_body"] = extra_body
         response = self.client.chat.completions.create(model=self.model_name, messages=history, **gen_conf, **kwargs)
 
         if any([not response.choices, not response.choices[0].message, not response.choices[0].message.content]):
@@ -130,7 +139,8 @@ class Base(ABC):
     def _chat_streamly(self, history, gen_conf, **kwargs):
         logging.info("[HISTORY STREAMLY]" + json.dumps(history, ensure_ascii=False, indent=4))
         reasoning_start = False
-        response = self.client.chat.completions.create(model=self.model_name, messages=history, stream=True, **gen_conf, stop=kwargs.get("stop"))
+        extra_body = {"prompt_cache_key": kwargs["prompt_cache_key"]} if kwargs.get("prompt_cache_key") else None
+        response = self.client.chat.completions.create(model=self.model_name, messages=history, stream=True, **gen_conf, stop=kwargs.get("stop"), extra_body=extra_body)
         for resp in response:
             if not resp.choices:
                 continue
@@ -466,6 +476,7 @@ class Base(ABC):
 
 class GptTurbo(Base):
     _FACTORY_NAME = "OpenAI"
+    _SUPPORT_PROMPT_CACHE_KEY = True
 
     def __init__(self, key, model_name="gpt-3.5-turbo", base_url="https://api.openai.com/v1", **kwargs):
         if not base_url:
@@ -967,6 +978,7 @@ class LmStudioChat(Base):
 
 class OpenAI_APIChat(Base):
     _FACTORY_NAME = ["VLLM", "OpenAI-API-Compatible"]
+    _SUPPORT_PROMPT_CACHE_KEY = True
 
     def __init__(self, key, model_name, base_url, **kwargs):
         if not base_url:
@@ -221,6 +221,41 @@ class TestSessionsWithChatAssistantList:
         else:
             assert res["message"] == expected_message
 
+    @pytest.mark.p2
+    @pytest.mark.parametrize("desc", ["true", "false"])
+    def test_cursor_pages(self, HttpApiAuth, add_sessions_with_chat_assistant, desc):
+        chat_assistant_id, session_ids = add_sessions_with_chat_assistant
+        res = list_session_with_chat_assistants(HttpApiAuth, chat_assistant_id, params={"desc": desc, "page_size": 3})
+        assert res["code"] == 0
+        first_page = res["data"]
+        assert len(first_page) == 3
+
+        last = first_page[-1]
+        params = {"desc": desc, "page_size": 3, "cursor": f"{last['create_time']},{last['id']}"}
+        res = list_session_with_chat_assistants(HttpApiAuth, chat_assistant_id, params=params)
+        assert res["code"] == 0
+        second_page = res["data"]
+        assert len(second_page) == 2
+
+        res = list_session_with_chat_assistants(HttpApiAuth, chat_assistant_id, params={"desc": desc, "page_size": 5})
+        assert [s["id"] for s in first_page + second_page] == [s["id"] for s in res["data"]]
+        assert sorted(s["id"] for s in first_page + second_page) == sorted(session_ids)
+
+    @pytest.mark.p2
+    @pytest.mark.parametrize(
+        "params, expected_message",
+        [
+            ({"cursor": "abc"}, "`cursor` must be '<orderby value>,<session id>'."),
+            ({"cursor": "abc,session_id"}, "`cursor` must be '<orderby value>,<session id>'."),
+            ({"cursor": "1,session_id", "orderby": "name"}, "`cursor` is only supported when `orderby` is create_time or update_time."),
+        ],
+    )
+    def test_invalid_cursor(self, HttpApiAuth, add_sessions_with_chat_assistant, params, expected_message):
+        chat_assistant_id, _ = add_sessions_with_chat_assistant
+        res = list_session_with_chat_assistants(HttpApiAuth, chat_assistant_id, params=params)
+        assert res["code"] == 102
+        assert res["message"] == expected_message
+
     @pytest.mark.p3
     def test_concurrent_list(self, HttpApiAuth, add_sessions_with_chat_assistant):
         count = 100
@@ -14,6 +14,8 @@
 #  limitations under the License.
 #
 from pathlib import Path
+from time import sleep
+from uuid import uuid4
 
 import requests
 from configs import HOST_ADDRESS, VERSION
@@ -26,6 +28,8 @@ KB_APP_URL = f"/{VERSION}/kb"
 DOCUMENT_APP_URL = f"/{VERSION}/document"
 CHUNK_API_URL = f"/{VERSION}/chunk"
 DIALOG_APP_URL = f"/{VERSION}/dialog"
+CONVERSATION_APP_URL = f"/{VERSION}/conversation"
+CHAT_LOG_APP_URL = f"/{VERSION}/chat_log"
 # SESSION_WITH_CHAT_ASSISTANT_API_URL = "/api/v1/chats/{chat_id}/sessions"
 # SESSION_WITH_AGENT_API_URL = "/api/v1/agents/{agent_id}/sessions"
 
@@ -258,3 +262,45 @@ def delete_dialogs(auth):
         dialog_ids = [dialog["id"] for dialog in res["data"]]
         if dialog_ids:
             delete_dialog(auth, {"dialog_ids": dialog_ids})
+
+
+# CONVERSATION APP
+def create_conversation(auth, payload=None, *, headers=HEADERS, data=None):
+    res = requests.post(url=f"{HOST_ADDRESS}{CONVERSATION_APP_URL}/set", headers=headers, auth=auth, json=payload, data=data)
+    return res.json()
+
+
+def completion(auth, payload=None, *, headers=HEADERS, data=None):
+    res = requests.post(url=f"{HOST_ADDRESS}{CONVERSATION_APP_URL}/completion", headers=headers, auth=auth, json=payload, data=data)
+    return res.json()
+
+
+# CHAT LOG APP
+def list_chat_logs(auth, params=None, *, headers=HEADERS):
+    res = requests.get(url=f"{HOST_ADDRESS}{CHAT_LOG_APP_URL}/list", headers=headers, auth=auth, params=params)
+    return res.json()
+
+
+def list_flagged_chat_logs(auth, params=None, *, headers=HEADERS):
+    res = requests.get(url=f"{HOST_ADDRESS}{CHAT_LOG_APP_URL}/flagged", headers=headers, auth=auth, params=params)
+    return res.json()
+
+
+def export_chat_logs(auth, params=None, *, headers=HEADERS):
+    res = requests.get(url=f"{HOST_ADDRESS}{CHAT_LOG_APP_URL}/export", headers=headers, auth=auth, params=params)
+    return res
+
+
+def delete_all_chat_logs(auth, *, headers=HEADERS):
+    res = requests.delete(url=f"{HOST_ADDRESS}{CHAT_LOG_APP_URL}/delete_all", headers=headers, auth=auth)
+    return res.json()
+
+
+def batch_add_chat_logs(auth, dialog_id, num):
+    conversation_id = uuid4().hex
+    create_conversation(auth, {"conversation_id": conversation_id, "dialog_id": dialog_id, "is_new": True})
+    for i in range(num):
+        completion(auth, {"conversation_id": conversation_id, "messages": [{"role": "user", "content": f"chat log test {i}"}], "stream": False})
+    # Chat logs are written by a background thread shortly after each turn
+    sleep(1)
+    return conversation_id
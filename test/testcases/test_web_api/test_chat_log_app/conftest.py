@@ -0,0 +1,30 @@
+#
+#  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import pytest
+from common import batch_add_chat_logs, batch_create_dialogs, delete_all_chat_logs, delete_dialogs
+
+
+@pytest.fixture(scope="class")
+def add_chat_logs(request, WebApiAuth, add_dataset):
+    def cleanup():
+        delete_all_chat_logs(WebApiAuth)
+        delete_dialogs(WebApiAuth)
+
+    request.addfinalizer(cleanup)
+
+    delete_all_chat_logs(WebApiAuth)
+    dialog_id = batch_create_dialogs(WebApiAuth, 1, [add_dataset])[0]
+    return batch_add_chat_logs(WebApiAuth, dialog_id, 5)
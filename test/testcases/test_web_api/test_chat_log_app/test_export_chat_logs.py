@@ -0,0 +1,51 @@
+#
+#  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import csv
+import io
+
+import pytest
+from common import export_chat_logs, list_chat_logs
+
+
+@pytest.mark.usefixtures("add_chat_logs")
+class TestChatLogExport:
+    @pytest.mark.p1
+    def test_json_export(self, WebApiAuth):
+        res = list_chat_logs(WebApiAuth, {"limit": 200})
+        assert res["code"] == 0, res
+        expected = [log["id"] for log in res["data"]["logs"]]
+
+        res = export_chat_logs(WebApiAuth, {"format": "json"})
+        assert res.status_code == 200, res.text
+        body = res.json()
+        assert body["code"] == 0, body
+        assert body["data"]["export_timestamp"], body
+        assert body["data"]["total_count"] == len(expected), body
+        assert [log["id"] for log in body["data"]["logs"]] == expected, body
+        assert all(log["question"].startswith("chat log test") for log in body["data"]["logs"]), body
+
+    @pytest.mark.p2
+    def test_csv_export(self, WebApiAuth):
+        res = export_chat_logs(WebApiAuth, {"format": "csv"})
+        assert res.status_code == 200, res.text
+        rows = list(csv.reader(io.StringIO(res.text)))
+        assert rows[0][:4] == ["id", "create_time", "user_id", "question"], res.text
+        assert len(rows) == 6, res.text
+
+    @pytest.mark.p3
+    def test_invalid_format(self, WebApiAuth):
+        res = export_chat_logs(WebApiAuth, {"format": "xml"})
+        assert res.json()["code"] == 102, res.text
@@ -0,0 +1,91 @@
+#
+#  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import pytest
+from common import list_chat_logs, list_flagged_chat_logs
+
+
+@pytest.mark.usefixtures("add_chat_logs")
+class TestChatLogList:
+    @pytest.mark.p1
+    def test_default_skips_exact_count(self, WebApiAuth):
+        res = list_chat_logs(WebApiAuth, {"limit": 2})
+        assert res["code"] == 0, res
+        pagination = res["data"]["pagination"]
+        assert pagination["has_more"] is True, res
+        assert pagination["next_cursor"], res
+        # Unfiltered views still report the total from the tenant totals
+        assert pagination["total"] == res["data"]["totals"]["total_chats"], res
+
+    @pytest.mark.p1
+    def test_exact_count_disabled_on_search(self, WebApiAuth):
+        res = list_chat_logs(WebApiAuth, {"limit": 2, "search": "chat log test", "exact_count": 0})
+        assert res["code"] == 0, res
+        pagination = res["data"]["pagination"]
+        assert pagination["has_more"] is True, res
+        assert "total" not in pagination, res
+        assert "pages" not in pagination, res
+
+    @pytest.mark.p2
+    def test_exact_count_on_search(self, WebApiAuth):
+        res = list_chat_logs(WebApiAuth, {"limit": 2, "search": "chat log test", "exact_count": 1})
+        assert res["code"] == 0, res
+        assert res["data"]["pagination"]["total"] == 5, res
+        assert res["data"]["pagination"]["pages"] == 3, res
+
+    @pytest.mark.p1
+    def test_cursor_pages(self, WebApiAuth):
+        res = list_chat_logs(WebApiAuth, {"limit": 5})
+        assert res["code"] == 0, res
+        expected = [log["id"] for log in res["data"]["logs"]]
+        assert len(expected) == 5, res
+
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["before"] = cursor
+            res = list_chat_logs(WebApiAuth, params)
+            assert res["code"] == 0, res
+            logs = res["data"]["logs"]
+            assert logs, res
+            ids.extend(log["id"] for log in logs)
+            cursor = res["data"]["pagination"]["next_cursor"]
+            if not res["data"]["pagination"]["has_more"]:
+                assert cursor is None, res
+                break
+        # Page boundaries neither repeat nor drop a log
+        assert ids == expected
+
+    @pytest.mark.p3
+    @pytest.mark.parametrize("cursor", ["abc", "123", "abc,def"])
+    def test_invalid_cursor(self, WebApiAuth, cursor):
+        res = list_chat_logs(WebApiAuth, {"before": cursor})
+        assert res["code"] == 102, res
+
+
+@pytest.mark.usefixtures("add_chat_logs")
+class TestFlaggedChatLogs:
+    @pytest.mark.p2
+    @pytest.mark.parametrize("limit", [1, 200])
+    def test_total(self, WebApiAuth, limit):
+        res = list_chat_logs(WebApiAuth, {"exact_count": 1})
+        assert res["code"] == 0, res
+        total_flagged = res["data"]["totals"]["total_flagged"]
+
+        res = list_flagged_chat_logs(WebApiAuth, {"limit": limit})
+        assert res["code"] == 0, res
+        assert res["data"]["count"] == min(limit, total_flagged), res
+        assert res["data"]["total"] == total_flagged, res
@@ -0,0 +1,120 @@
+#
+#  Copyright 2025 The InfiniFlow Authors. All Rights Reserved.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import numpy as np
+import pytest
+
+from api.utils import semantic_cache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, exp=None):
+        self.data[key] = value
+        return True
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(semantic_cache, "REDIS_CONN", redis)
+    return redis
+
+
+def unit_vector(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+KEY = semantic_cache.cache_key("tenant", "dialog")
+REFERENCE = {"chunks": [{"id": "chunk", "doc_type": "image"}], "doc_aggs": []}
+
+
+@pytest.mark.p1
+def test_hit_above_threshold():
+    semantic_cache.store(KEY, unit_vector(1, 0, 0), "answer", REFERENCE)
+    cached = semantic_cache.lookup(KEY, unit_vector(1, 0.01, 0))
+    assert cached["answer"] == "answer"
+    # The reference comes back as stored, formatted chunks included
+    assert cached["reference"] == REFERENCE
+
+
+@pytest.mark.p1
+def test_miss_below_threshold():
+    semantic_cache.store(KEY, unit_vector(1, 0, 0), "answer", REFERENCE)
+    assert semantic_cache.lookup(KEY, unit_vector(1, 1, 0)) is None
+    assert semantic_cache.lookup(semantic_cache.cache_key("tenant", "other"), unit_vector(1, 0, 0)) is None
+
+
+@pytest.mark.p2
+def test_dimension_mismatch_misses():
+    semantic_cache.store(KEY, unit_vector(1, 0, 0), "answer", REFERENCE)
+    assert semantic_cache.lookup(KEY, unit_vector(1, 0)) is None
+
+
+@pytest.mark.p1
+@pytest.mark.parametrize(
+    "llm_setting, expected",
+    [
+        (None, True),
+        ({}, True),
+        ({"temperature": 0}, True),
+        ({"temperature": semantic_cache.SEMANTIC_CACHE_MAX_TEMPERATURE}, True),
+        ({"temperature": "0.2"}, True),
+        ({"temperature": 0.31}, False),
+        ({"temperature": 1}, False),
+    ],
+)
+def test_temperature_gate(llm_setting, expected):
+    assert semantic_cache.temperature_allows_cache(llm_setting) is expected
+
+
+@pytest.mark.p2
+def test_trims_to_max_entries():
+    total = semantic_cache.SEMANTIC_CACHE_MAX_ENTRIES + 6
+    for i in range(total):
+        semantic_cache.store(KEY, unit_vector(1, i, 0), f"answer {i}", REFERENCE)
+    entries = semantic_cache._load(KEY)
+    assert len(entries) == semantic_cache.SEMANTIC_CACHE_MAX_ENTRIES
+    # The oldest answers are dropped first
+    assert entries[0]["answer"] == f"answer {total - semantic_cache.SEMANTIC_CACHE_MAX_ENTRIES}"
+    assert entries[-1]["answer"] == f"answer {total - 1}"
+
+
+@pytest.mark.p2
+def test_expired_entries_miss(monkeypatch):
+    semantic_cache.store(KEY, unit_vector(1, 0, 0), "answer", REFERENCE)
+    now = semantic_cache.time.time()
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now + semantic_cache.SEMANTIC_CACHE_TTL)
+    assert semantic_cache.lookup(KEY, unit_vector(1, 0, 0)) is None
+
+
+@pytest.mark.p1
+def test_flag_is_replayed():
+    semantic_cache.store(KEY, unit_vector(1, 0, 0), "answer", REFERENCE, is_flagged=True, flag_reason="out of scope")
+    cached = semantic_cache.lookup(KEY, unit_vector(1, 0, 0))
+    assert cached["is_flagged"] is True
+    assert cached["flag_reason"] == "out of scope"
+
+
+@pytest.mark.p3
+def test_corrupted_shard_misses(fake_redis):
+    fake_redis.set(KEY, "not json")
+    assert semantic_cache.lookup(KEY, unit_vector(1, 0, 0)) is None